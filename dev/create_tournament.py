@@ -4,27 +4,27 @@ Create Tournament
 Quickly create a new tournament via command line
 """
 
-from setup_firebase import init_firebase
+from setup_firebase import init_firebase, WRITE_RETRY
 from firebase_admin import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
 import sys
 import random
 import string
 
 def generate_tournament_code():
-    """Generate a unique 4-character tournament code"""
+    """Generate a unique 4-character tournament code (always uppercase)"""
     # All alphanumeric characters allowed
     chars = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
     return ''.join(random.choice(chars) for _ in range(4))
 
 def is_tournament_code_unique(db, tournament_code):
     """Check if tournament code already exists (case-insensitive)"""
-    tournament_code_upper = tournament_code.upper()
-    tournaments = db.collection('tournaments').get()
-    for tournament in tournaments:
-        existing_code = tournament.to_dict().get('tournamentCode', '')
-        if existing_code.upper() == tournament_code_upper:
-            return False
-    return True
+    # Codes are always stored uppercase, so an exact-match query on the
+    # single-field index replaces scanning every tournament document
+    query = db.collection('tournaments').where(
+        filter=FieldFilter('tournamentCode', '==', tournament_code.upper())
+    ).limit(1)
+    return len(list(query.stream())) == 0
 
 def generate_unique_tournament_code(db):
     """Generate a unique tournament code"""
@@ -48,7 +48,7 @@ def create_tournament(name, tournament_type='standard', timer_duration=5, max_pl
         'timerDuration': timer_duration,
         'maxPlayers': max_players,
         'totalRounds': total_rounds,
-        'tournamentCode': tournament_code,
+        'tournamentCode': tournament_code.upper(),
         'status': 'staging',
         'currentRound': 0,
         'roundInProgress': False,
@@ -64,7 +64,7 @@ def create_tournament(name, tournament_type='standard', timer_duration=5, max_pl
     print(f"   Tournament Code: {tournament_code}")
     
     tournament_ref = db.collection('tournaments').document()
-    tournament_ref.set(tournament_data)
+    tournament_ref.set(tournament_data, retry=WRITE_RETRY)
     
     print(f"\n✅ Tournament created!")
     print(f"   ID: {tournament_ref.id}")
@@ -5,21 +5,27 @@ Add a win to a specific player
 
 from setup_firebase import init_firebase
 from firebase_admin import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
 import sys
 
 def add_win(tournament_id, player_name, amount=1):
     """Add or remove wins from a player by name"""
     db = init_firebase()
     
-    # Find player by name
+    # Find player by name via the indexed nameLower field
     players_ref = db.collection('tournaments', tournament_id, 'players')
-    players = list(players_ref.stream())
+    query = players_ref.where(
+        filter=FieldFilter('nameLower', '==', player_name.lower())
+    ).limit(1)
+    matches = list(query.stream())
+    player_doc = matches[0] if matches else None
     
-    player_doc = None
-    for p in players:
-        if p.to_dict().get('name', '').lower() == player_name.lower():
-            player_doc = p
-            break
+    # Players created before nameLower existed need a full scan
+    if not player_doc:
+        for p in players_ref.stream():
+            if p.to_dict().get('name', '').lower() == player_name.lower():
+                player_doc = p
+                break
     
     if not player_doc:
         print(f"❌ Player '{player_name}' not found in tournament")
@@ -6,10 +6,33 @@ Auto-assign players to tables with multiple assignment algorithms
 3. Round Robin - Distribute ranks evenly across tables (1,5,9,13 | 2,6,10,14 | etc.)
 """
 
-from setup_firebase import init_firebase
+from setup_firebase import init_firebase, WRITE_RETRY
 from firebase_admin import firestore
 import sys
 import random
+from concurrent.futures import ThreadPoolExecutor
+
+# Firestore caps a batched write at 500 operations; leave some headroom
+MAX_BATCH_WRITES = 450
+
+# Player fields needed for seating and ranking; nothing else is fetched
+PLAYER_FIELDS = ['name', 'tableId', 'eliminated', 'wins', 'points', 'lastWinAt']
+
+def get_timestamp(player):
+    """Seconds of the player's last win, or 0 if they have none"""
+    last_win = player.get('lastWinAt')
+    if last_win and hasattr(last_win, 'seconds'):
+        return last_win.seconds
+    return 0
+
+def ranking_key(player):
+    """Sort key for tournament ranking (best player sorts first)"""
+    return (
+        -player.get('wins', 0),
+        -player.get('points', 0),
+        -get_timestamp(player),
+        player.get('name', '')
+    )
 
 def sort_players_by_ranking(players):
     """
@@ -19,19 +42,10 @@ def sort_players_by_ranking(players):
     2. Most points (descending)
     3. Most recent win timestamp (descending)
     4. Name (alphabetically as tie-breaker)
+    
+    sorted() computes ranking_key once per player, not per comparison
     """
-    def get_timestamp(player):
-        last_win = player.get('lastWinAt')
-        if last_win and hasattr(last_win, 'seconds'):
-            return last_win.seconds
-        return 0
-    
-    return sorted(players, key=lambda p: (
-        -p.get('wins', 0),
-        -p.get('points', 0),
-        -get_timestamp(p),
-        p.get('name', '')
-    ))
+    return sorted(players, key=ranking_key)
 
 def assign_by_algorithm(players, algorithm):
     """
@@ -70,9 +84,25 @@ def auto_assign_players(tournament_id, algorithm='random'):
     """Auto-assign unassigned players to tables using specified algorithm"""
     db = init_firebase()
     
-    # Get tournament
     tournament_ref = db.collection('tournaments').document(tournament_id)
-    tournament = tournament_ref.get()
+    players_ref = db.collection('tournaments', tournament_id, 'players')
+    tables_ref = db.collection('tournaments', tournament_id, 'tables')
+    
+    # Tournament, players and existing tables are independent reads, so
+    # fetch them concurrently instead of paying three round-trips in a row
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        tournament_future = executor.submit(tournament_ref.get)
+        # Unassigned, non-eliminated players are picked out as the stream
+        # arrives rather than buffering every snapshot first
+        players_future = executor.submit(lambda: [
+            {'id': p.id, **p_data}
+            for p in players_ref.select(PLAYER_FIELDS).stream()
+            if not (p_data := p.to_dict()).get('tableId') and not p_data.get('eliminated', False)
+        ])
+        tables_future = executor.submit(lambda: list(tables_ref.select(['tableNumber']).stream()))
+        tournament = tournament_future.result()
+        unassigned = players_future.result()
+        existing_tables = tables_future.result()
     
     if not tournament.exists:
         print(f"❌ Tournament {tournament_id} not found")
@@ -83,16 +113,6 @@ def auto_assign_players(tournament_id, algorithm='random'):
     print(f"\n🏆 Tournament: {t_data.get('name', 'Unnamed')}")
     print(f"📍 Current Round: {current_round}")
     
-    # Get unassigned, non-eliminated players
-    players_ref = db.collection('tournaments', tournament_id, 'players')
-    all_players = list(players_ref.stream())
-    
-    unassigned = []
-    for p in all_players:
-        p_data = p.to_dict()
-        if not p_data.get('tableId') and not p_data.get('eliminated', False):
-            unassigned.append({'id': p.id, **p_data})
-    
     if len(unassigned) == 0:
         print("❌ No unassigned players found")
         return
@@ -132,34 +152,34 @@ def auto_assign_players(tournament_id, algorithm='random'):
     table_assignments = assign_by_algorithm(unassigned, algorithm)
     
     # Get next table number
-    existing_tables = list(db.collection('tournaments', tournament_id, 'tables').stream())
     table_numbers = [t.to_dict().get('tableNumber', 0) for t in existing_tables]
     next_table_num = max(table_numbers) + 1 if table_numbers else 1
     
     positions = ['East', 'South', 'West', 'North']
+    remainder = len(unassigned) % 4
+    
+    # Build every write up front as (operation, reference, payload) so the
+    # write phase below is nothing but batch calls
+    writes = []
+    table_summaries = []
     
-    # Create tables using assigned groups
     for i, table_players in enumerate(table_assignments):
-        # Create table
-        table_ref = db.collection('tournaments', tournament_id, 'tables').document()
+        table_ref = tables_ref.document()
         table_id = table_ref.id
         
-        player_ids = [p['id'] for p in table_players]
-        positions_map = {p['id']: positions[j] for j, p in enumerate(table_players)}
-        
-        table_ref.set({
+        writes.append(('set', table_ref, {
             'tableNumber': next_table_num + i,
-            'players': player_ids,
-            'positions': positions_map,
+            'players': [p['id'] for p in table_players],
+            'positions': {p['id']: positions[j] for j, p in enumerate(table_players)},
             'createdAt': firestore.SERVER_TIMESTAMP
-        })
-        
-        # Update players
-        for j, player in enumerate(table_players):
-            db.collection('tournaments', tournament_id, 'players').document(player['id']).update({
+        }))
+        writes.extend(
+            ('update', players_ref.document(player['id']), {
                 'tableId': table_id,
                 'position': positions[j]
             })
+            for j, player in enumerate(table_players)
+        )
         
         # Show table assignment with ranking info if using ranking algorithms
         player_info = []
@@ -169,13 +189,26 @@ def auto_assign_players(tournament_id, algorithm='random'):
                 player_info.append(f"{p['name']} ({wins}W)")
             else:
                 player_info.append(p['name'])
-        
-        print(f"   ✅ Table {next_table_num + i}: {', '.join(player_info)}")
+        table_summaries.append(f"   ✅ Table {next_table_num + i}: {', '.join(player_info)}")
+    
+    # Player snapshots are no longer needed once the payloads exist
+    del unassigned, table_assignments
+    
+    # Pack table creates and player updates into batched writes instead of
+    # one round-trip per document, committing before the 500-write limit
+    for start in range(0, len(writes), MAX_BATCH_WRITES):
+        batch = db.batch()
+        for op, ref, payload in writes[start:start + MAX_BATCH_WRITES]:
+            getattr(batch, op)(ref, payload)
+        batch.commit(retry=WRITE_RETRY)
+    
+    for summary in table_summaries:
+        print(summary)
     
     print(f"\n{'='*50}")
     print(f"✅ Created {num_tables} table(s) using '{algorithm_names.get(algorithm, algorithm)}' algorithm!")
-    if len(unassigned) % 4 != 0:
-        print(f"   {len(unassigned) % 4} player(s) remain unassigned")
+    if remainder != 0:
+        print(f"   {remainder} player(s) remain unassigned")
     print(f"{'='*50}\n")
 
 if __name__ == "__main__":
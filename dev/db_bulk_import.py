@@ -4,40 +4,40 @@ Bulk Player Import
 Import multiple players from a text/CSV file
 """
 
-from setup_firebase import init_firebase
+from setup_firebase import init_firebase, WRITE_RETRY
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from firebase_admin import firestore
 
+# Concurrent player writes during import
+IMPORT_WORKERS = 40
+
+# Concurrent player-count queries when listing tournaments
+COUNT_WORKERS = 16
+
+def iter_names(file_path):
+    """Yield stripped, non-empty names from a file one line at a time"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            name = line.strip()
+            if name:
+                yield name
+
 def bulk_import_players(tournament_id, file_path):
     """Import players from a file (one name per line)"""
     db = init_firebase()
     
-    # Read file
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            names = [line.strip() for line in f if line.strip()]
-    except FileNotFoundError:
-        print(f"❌ File not found: {file_path}")
-        return
-    except Exception as e:
-        print(f"❌ Error reading file: {e}")
-        return
-    
-    if not names:
-        print("❌ No player names found in file")
-        return
-    
-    print(f"\n📋 Found {len(names)} name(s) in file")
-    
-    # Check for duplicates in the file
-    unique_names = list(dict.fromkeys([name.lower() for name in names]))
-    if len(unique_names) < len(names):
-        duplicate_count = len(names) - len(unique_names)
-        print(f"⚠️  Warning: Found {duplicate_count} duplicate(s) in file (will be skipped)")
-    
-    # Get existing players
+    # Look up the tournament first so a full tournament never reads the file.
+    # The tournament doc and its existing players are independent reads, so
+    # fetch them concurrently.
     tournament_ref = db.collection('tournaments').document(tournament_id)
-    tournament = tournament_ref.get()
+    players_ref = db.collection('tournaments', tournament_id, 'players')
+    
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        tournament_future = executor.submit(tournament_ref.get)
+        players_future = executor.submit(lambda: list(players_ref.select(['name']).stream()))
+        tournament = tournament_future.result()
+        existing_players = players_future.result()
     
     if not tournament.exists:
         print(f"❌ Tournament not found: {tournament_id}")
@@ -48,23 +48,62 @@ def bulk_import_players(tournament_id, file_path):
     
     # Check player limit
     max_players = tournament_data.get('maxPlayers', 0)
-    players_ref = db.collection('tournaments', tournament_id, 'players')
-    existing_players = list(players_ref.stream())
     current_count = len(existing_players)
     
+    available = max_players - current_count if max_players > 0 else None
+    if available is not None and available <= 0:
+        print(f"\n⚠️  Tournament limit: {max_players} players")
+        print(f"   Current: {current_count} players")
+        print("❌ Tournament is at maximum capacity")
+        return
+    
     existing_names = {p.to_dict().get('name', '').lower(): p.to_dict().get('name', '') 
                       for p in existing_players}
     
-    # Filter out duplicates
+    # Read and filter names in one lazy pass: duplicates within the file and
+    # against the database are dropped, and reading stops one name past the
+    # available slots (enough to know the file exceeds the limit)
     new_names = []
     skipped = []
+    seen_lower = set()
+    duplicate_count = 0
+    names_read = 0
+    over_limit = False
     
-    for name in names:
-        name_lower = name.lower()
-        if name_lower in existing_names:
-            skipped.append(f"{name} (already exists as '{existing_names[name_lower]}')")
-        elif name_lower not in [n.lower() for n in new_names]:
-            new_names.append(name)
+    try:
+        for name in iter_names(file_path):
+            names_read += 1
+            name_lower = name.lower()
+            if name_lower in seen_lower:
+                duplicate_count += 1
+                continue
+            seen_lower.add(name_lower)
+            
+            if name_lower in existing_names:
+                skipped.append(f"{name} (already exists as '{existing_names[name_lower]}')")
+            elif available is not None and len(new_names) == available:
+                over_limit = True
+                break
+            else:
+                new_names.append(name)
+    except FileNotFoundError:
+        print(f"❌ File not found: {file_path}")
+        return
+    except Exception as e:
+        print(f"❌ Error reading file: {e}")
+        return
+    
+    if names_read == 0:
+        print("❌ No player names found in file")
+        return
+    
+    if over_limit:
+        print(f"\n📋 Read {names_read} name(s) from file (stopped at the player limit)")
+    else:
+        print(f"\n📋 Found {names_read} name(s) in file")
+    
+    if duplicate_count > 0:
+        print(f"⚠️  Warning: Found {duplicate_count} duplicate(s) in file (will be skipped)")
     
     if skipped:
         print(f"\n⚠️  {len(skipped)} player(s) will be skipped:")
@@ -76,24 +115,16 @@ def bulk_import_players(tournament_id, file_path):
         return
     
     # Check max players limit
-    if max_players > 0:
-        available = max_players - current_count
-        if len(new_names) > available:
-            print(f"\n⚠️  Tournament limit: {max_players} players")
-            print(f"   Current: {current_count} players")
-            print(f"   Available slots: {available}")
-            print(f"   Trying to import: {len(new_names)} players")
-            
-            if available <= 0:
-                print("❌ Tournament is at maximum capacity")
-                return
-            
-            response = input(f"\nOnly {available} player(s) can be added. Import first {available}? (y/N): ")
-            if response.lower() != 'y':
-                print("Cancelled.")
-                return
-            
-            new_names = new_names[:available]
+    if over_limit:
+        print(f"\n⚠️  Tournament limit: {max_players} players")
+        print(f"   Current: {current_count} players")
+        print(f"   Available slots: {available}")
+        print(f"   Trying to import: more than {available} players")
+        
+        response = input(f"\nOnly {available} player(s) can be added. Import first {available}? (y/N): ")
+        if response.lower() != 'y':
+            print("Cancelled.")
+            return
     
     # Preview and confirm
     print(f"\n📥 Will import {len(new_names)} player(s):")
@@ -110,25 +141,33 @@ def bulk_import_players(tournament_id, file_path):
     imported = 0
     failed = 0
     
-    for name in new_names:
-        try:
-            player_ref = players_ref.document()
-            player_ref.set({
-                'name': name,
-                'registeredAt': firestore.SERVER_TIMESTAMP,
-                'tableId': None,
-                'position': None,
-                'wins': 0,
-                'points': 0,
-                'lastWinAt': None,
-                'eliminated': False,
-                'eliminatedInRound': None
-            })
-            print(f"   ✅ {name}")
-            imported += 1
-        except Exception as e:
-            print(f"   ❌ {name}: {e}")
-            failed += 1
+    def write_player(name):
+        players_ref.document().set({
+            'name': name,
+            'nameLower': name.lower(),
+            'registeredAt': firestore.SERVER_TIMESTAMP,
+            'tableId': None,
+            'position': None,
+            'wins': 0,
+            'points': 0,
+            'lastWinAt': None,
+            'eliminated': False,
+            'eliminatedInRound': None
+        }, retry=WRITE_RETRY)
+        return name
+    
+    # Writes are latency-bound, so keep many in flight at once
+    with ThreadPoolExecutor(max_workers=IMPORT_WORKERS) as executor:
+        futures = {executor.submit(write_player, name): name for name in new_names}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                future.result()
+                print(f"   ✅ {name}")
+                imported += 1
+            except Exception as e:
+                print(f"   ❌ {name}: {e}")
+                failed += 1
     
     print(f"\n{'='*50}")
     print(f"✅ Successfully imported: {imported} player(s)")
@@ -146,12 +185,19 @@ def list_tournaments_for_import():
         print("No tournaments found.")
         return
     
+    def count_players(tournament):
+        # Server-side aggregation: one read instead of streaming every player
+        result = db.collection('tournaments', tournament.id, 'players').count().get()
+        return result[0][0].value
+    
+    with ThreadPoolExecutor(max_workers=COUNT_WORKERS) as executor:
+        player_counts = list(executor.map(count_players, tournaments))
+    
     print("\n📋 Available Tournaments:")
     print("="*50)
     
-    for t in tournaments:
+    for t, players_count in zip(tournaments, player_counts):
         t_data = t.to_dict()
-        players_count = len(list(db.collection('tournaments', t.id, 'players').stream()))
         max_players = t_data.get('maxPlayers', 0)
         max_str = f"/ {max_players}" if max_players > 0 else ""
         
@@ -4,12 +4,106 @@ Database Cleanup Utilities
 Scripts to clean up and maintain your Firebase database
 """
 
-from setup_firebase import init_firebase
+from setup_firebase import init_firebase, WRITE_RETRY
+from google.cloud.firestore_v1.bulk_writer import BulkRetry, BulkWriterOptions
+from google.rpc import code_pb2
+import itertools
 import sys
+from collections import defaultdict
 
-def delete_tournament(tournament_id):
+# BulkWriter starts at this rate and ramps up by 50% every 5 minutes, up to
+# the max, following Firestore's 500/50/5 traffic guidance. The SDK's
+# default max equals the starting rate, which would never ramp.
+DELETE_OPS_PER_SECOND = 500
+DELETE_MAX_OPS_PER_SECOND = 10000
+
+# A failed delete is retried with exponential backoff when its status is
+# transient, up to this many attempts
+DELETE_MAX_ATTEMPTS = 10
+TRANSIENT_CODES = {
+    code_pb2.ABORTED,
+    code_pb2.DEADLINE_EXCEEDED,
+    code_pb2.UNAVAILABLE,
+    code_pb2.RESOURCE_EXHAUSTED,
+}
+
+def _bulk_delete(db, ref_groups):
+    """
+    Delete every reference in ref_groups through one BulkWriter
+    
+    ref_groups maps a label to an iterable of references; returns the
+    number of references enqueued per label. The writer parallelizes and
+    throttles commits itself; close() waits for all of them.
+    """
+    failures = []
+    
+    def on_write_error(error, bulk_writer):
+        # Deletes are idempotent, so retrying a transient failure is safe
+        if error.code in TRANSIENT_CODES and error.attempts < DELETE_MAX_ATTEMPTS:
+            return True
+        failures.append(error)
+        return False
+    
+    writer = db.bulk_writer(options=BulkWriterOptions(
+        initial_ops_per_second=DELETE_OPS_PER_SECOND,
+        max_ops_per_second=DELETE_MAX_OPS_PER_SECOND,
+        retry=BulkRetry.exponential
+    ))
+    writer.on_write_error(on_write_error)
+    
+    counts = {}
+    try:
+        for label, refs in ref_groups.items():
+            counts[label] = 0
+            for ref in refs:
+                writer.delete(ref)
+                counts[label] += 1
+    finally:
+        writer.close()
+    
+    if failures:
+        raise RuntimeError(f"{len(failures)} delete(s) failed, first: {failures[0].message}")
+    return counts
+
+def _tournament_data_refs(tournament_ref):
+    """
+    References to every document under a tournament, grouped for
+    _bulk_delete: players, tables, every round's participants and the
+    rounds themselves. The tournament document is not included.
+    """
+    # Deletion needs only references, so fetch keys without document bodies
+    players = tournament_ref.collection('players').select([]).stream()
+    tables = tournament_ref.collection('tables').select([]).stream()
+    rounds = list(tournament_ref.collection('rounds').select([]).stream())
+    participants = itertools.chain.from_iterable(
+        r.reference.collection('participants').select([]).stream()
+        for r in rounds
+    )
+    
+    return {
+        'players': (p.reference for p in players),
+        'tables': (t.reference for t in tables),
+        'participants': (p.reference for p in participants),
+        'rounds': (r.reference for r in rounds),
+    }
+
+def _delete_tournament_data(db, tournament_ref):
+    """
+    Delete a tournament and all its subcollections without prompting
+    
+    Takes the reference directly so callers that already listed the
+    tournament don't pay for another read of it.
+    """
+    # Every subcollection drains through one writer
+    counts = _bulk_delete(db, _tournament_data_refs(tournament_ref))
+    
+    # Delete tournament
+    tournament_ref.delete(retry=WRITE_RETRY)
+    return counts
+
+def delete_tournament(tournament_id, db=None):
     """Delete a specific tournament and all its data"""
-    db = init_firebase()
+    db = db or init_firebase()
     
     # Get tournament
     tournament_ref = db.collection('tournaments').document(tournament_id)
@@ -29,37 +123,17 @@ def delete_tournament(tournament_id):
     
     print(f"\nDeleting tournament: {t_data.get('name')}...")
     
-    # Delete all players
-    players = list(db.collection('tournaments', tournament_id, 'players').stream())
-    print(f"  Deleting {len(players)} players...")
-    for player in players:
-        player.reference.delete()
-    
-    # Delete all tables
-    tables = list(db.collection('tournaments', tournament_id, 'tables').stream())
-    print(f"  Deleting {len(tables)} tables...")
-    for table in tables:
-        table.reference.delete()
-    
-    # Delete all rounds and their participants
-    rounds = list(db.collection('tournaments', tournament_id, 'rounds').stream())
-    print(f"  Deleting {len(rounds)} rounds...")
-    for round_doc in rounds:
-        # Delete participants first
-        participants = list(db.collection('tournaments', tournament_id, 'rounds', round_doc.id, 'participants').stream())
-        for participant in participants:
-            participant.reference.delete()
-        round_doc.reference.delete()
-    
-    # Delete tournament
-    tournament_ref.delete()
+    counts = _delete_tournament_data(db, tournament_ref)
+    print(f"  Deleted {counts['players']} players")
+    print(f"  Deleted {counts['tables']} tables")
+    print(f"  Deleted {counts['rounds']} rounds ({counts['participants']} participants)")
     print(f"✅ Deleted tournament: {t_data.get('name')}\n")
 
-def delete_all_tournaments():
+def delete_all_tournaments(db=None):
     """Delete ALL tournaments"""
-    db = init_firebase()
+    db = db or init_firebase()
     
-    tournaments = list(db.collection('tournaments').stream())
+    tournaments = list(db.collection('tournaments').select(['name']).stream())
     
     if len(tournaments) == 0:
         print("No tournaments to delete.")
@@ -76,8 +150,17 @@ def delete_all_tournaments():
         return
     
     print("\nDeleting all tournaments...")
-    for tournament in tournaments:
-        delete_tournament(tournament.id)
+    
+    # The single 'DELETE ALL' confirmation covers every tournament, so purge
+    # them without a per-tournament prompt. Every tournament's subcollections
+    # drain through one writer, so the whole purge shares a single rate
+    # limit; the tournament documents go once their data is gone.
+    groups = [_tournament_data_refs(t.reference) for t in tournaments]
+    _bulk_delete(db, {
+        label: itertools.chain.from_iterable([group[label] for group in groups])
+        for label in ('players', 'tables', 'participants', 'rounds')
+    })
+    _bulk_delete(db, {'tournaments': (t.reference for t in tournaments)})
     
     print("✅ All tournaments deleted!\n")
 
@@ -109,14 +192,13 @@ def delete_all_data():
     print("\n☢️  Starting nuclear cleanup...")
     
     # Delete all tournaments
-    delete_all_tournaments()
+    delete_all_tournaments(db)
     
     # Delete test collection
-    test_docs = list(db.collection('test').stream())
+    test_docs = list(db.collection('test').select([]).stream())
     if test_docs:
         print(f"Deleting {len(test_docs)} test documents...")
-        for doc in test_docs:
-            doc.reference.delete()
+        _bulk_delete(db, {'test': (doc.reference for doc in test_docs)})
     
     print("☢️  Database wiped clean!\n")
 
@@ -126,16 +208,25 @@ def find_orphaned_data():
     
     print("\n🔍 Scanning for orphaned data...\n")
     
-    tournaments = list(db.collection('tournaments').stream())
+    tournaments = list(db.collection('tournaments').select(['name']).stream())
     orphan_count = 0
     
+    # Two collection-group queries cover every tournament's players and
+    # tables (only the fields the checks read); bucket them by the
+    # tournament in each document's path
+    players_by_tournament = defaultdict(dict)
+    tables_by_tournament = defaultdict(dict)
+    for p in db.collection_group('players').select(['name', 'tableId']).stream():
+        players_by_tournament[p.reference.parent.parent.id][p.id] = p
+    for t in db.collection_group('tables').select(['players', 'tableNumber']).stream():
+        tables_by_tournament[t.reference.parent.parent.id][t.id] = t
+    
     for tournament in tournaments:
         t_data = tournament.to_dict()
         print(f"Checking: {t_data.get('name', 'Unnamed')}...")
         
-        # Get all players and tables
-        players = {p.id: p for p in db.collection('tournaments', tournament.id, 'players').stream()}
-        tables = {t.id: t for t in db.collection('tournaments', tournament.id, 'tables').stream()}
+        players = players_by_tournament[tournament.id]
+        tables = tables_by_tournament[tournament.id]
         
         # Check players assigned to non-existent tables
         for player_id, player in players.items():
@@ -3,16 +3,20 @@
 Debug script to check Olivia Nelson's ranking
 """
 
-import firebase_admin
-from firebase_admin import credentials, firestore
+from setup_firebase import init_firebase
 from datetime import datetime
+from collections import defaultdict
+from operator import itemgetter
 
-# Initialize Firebase
-if not firebase_admin._apps:
-    cred = credentials.Certificate('serviceAccountKey.json')
-    firebase_admin.initialize_app(cred)
+# Shared Firestore client
+db = init_firebase()
 
-db = firestore.client()
+# Lowercased pieces of the name being debugged; each must appear somewhere
+# in a player's name for it to match
+TARGET_NAME_PARTS = ('olivia', 'nelson')
+
+# Player fields the report and ranking read
+PLAYER_FIELDS = ['name', 'eliminated', 'tableId', 'lastWinAt', 'scoreEvents']
 
 def debug_olivia_ranking(tournament_id):
     """Debug Olivia Nelson's ranking"""
@@ -34,16 +38,21 @@ def debug_olivia_ranking(tournament_id):
     print(f"Type: {tournament_data.get('type')}")
     print(f"{'='*80}\n")
     
-    # Get all players
+    # Get all players (only the fields the report reads); tag each dict with
+    # its ID in place rather than copying it into a merged dict
     players_ref = tournament_ref.collection('players')
-    players = {doc.id: {**doc.to_dict(), 'id': doc.id} for doc in players_ref.stream()}
+    players = {}
+    for doc in players_ref.select(PLAYER_FIELDS).stream():
+        player = doc.to_dict()
+        player['id'] = doc.id
+        players[doc.id] = player
     
     # Find Olivia Nelson
     olivia = None
     for player_id, player_data in players.items():
-        if 'olivia' in player_data.get('name', '').lower() and 'nelson' in player_data.get('name', '').lower():
+        name_lower = player_data.get('name', '').lower()
+        if all(part in name_lower for part in TARGET_NAME_PARTS):
             olivia = player_data
-            olivia['id'] = player_id
             break
     
     if not olivia:
@@ -77,32 +86,46 @@ def debug_olivia_ranking(tournament_id):
     
     print(f"\n  Last Completed Round: {last_completed_round}")
     
-    # Calculate tournament score
-    tournament_score = 0
-    for event in score_events:
-        multiplier = rounds_map.get(event.get('roundNumber'), {}).get('scoreMultiplier', 1)
-        tournament_score += event.get('delta', 0) * multiplier
-    
-    # Calculate round score for last completed round
-    round_score = 0
-    for event in score_events:
-        if event.get('roundNumber') == last_completed_round:
-            multiplier = rounds_map.get(last_completed_round, {}).get('scoreMultiplier', 1)
-            round_score += event.get('delta', 0) * multiplier
+    # The last completed round's seating, read once and reused for Olivia's
+    # table and for every player's table score below
+    parts_data = []
+    if last_completed_round > 0:
+        round_id = rounds_map[last_completed_round]['id']
+        participants_ref = tournament_ref.collection('rounds').document(round_id).collection('participants')
+        for part_doc in participants_ref.select(['playerId', 'tableId']).stream():
+            part_data = part_doc.to_dict()
+            parts_data.append((part_data.get('playerId'), part_data.get('tableId')))
+    
+    # Per-round multipliers, looked up once rather than per event
+    multipliers = {round_num: r['scoreMultiplier'] for round_num, r in rounds_map.items()}
+    last_multiplier = multipliers.get(last_completed_round, 1)
+    
+    # Tournament and last-completed-round score for every player, computed
+    # once (eliminated players still count toward their table's total)
+    player_scores = {}
+    for player_id, player in players.items():
+        # One pass over the events accumulates both totals
+        t_score = 0
+        r_score = 0
+        for event in player.get('scoreEvents', []):
+            delta = event.get('delta', 0)
+            round_num = event.get('roundNumber')
+            t_score += delta * multipliers.get(round_num, 1)
+            if round_num == last_completed_round:
+                r_score += delta * last_multiplier
+        player_scores[player_id] = (t_score, r_score)
+    
+    tournament_score, round_score = player_scores[olivia['id']]
     
     print(f"  - Tournament Score: {tournament_score}")
     print(f"  - Round {last_completed_round} Score: {round_score}")
     
     # Get table assignment from last completed round participants
     if last_completed_round > 0:
-        round_id = rounds_map[last_completed_round]['id']
-        participants_ref = tournament_ref.collection('rounds').document(round_id).collection('participants')
-        
         olivia_table_id = None
-        for part_doc in participants_ref.stream():
-            part_data = part_doc.to_dict()
-            if part_data.get('playerId') == olivia['id']:
-                olivia_table_id = part_data.get('tableId')
+        for player_id, table_id in parts_data:
+            if player_id == olivia['id']:
+                olivia_table_id = table_id
                 break
         
         print(f"  - Round {last_completed_round} Table ID: {olivia_table_id}")
@@ -110,22 +133,13 @@ def debug_olivia_ranking(tournament_id):
         # Get all players at that table
         if olivia_table_id:
             table_players = []
-            for part_doc in participants_ref.stream():
-                part_data = part_doc.to_dict()
-                if part_data.get('tableId') == olivia_table_id:
-                    player_id = part_data.get('playerId')
+            for player_id, table_id in parts_data:
+                if table_id == olivia_table_id:
                     player = players.get(player_id)
                     if player:
-                        # Calculate round score for this player
-                        player_round_score = 0
-                        for event in player.get('scoreEvents', []):
-                            if event.get('roundNumber') == last_completed_round:
-                                multiplier = rounds_map.get(last_completed_round, {}).get('scoreMultiplier', 1)
-                                player_round_score += event.get('delta', 0) * multiplier
-                        
                         table_players.append({
                             'name': player.get('name'),
-                            'roundScore': player_round_score
+                            'roundScore': player_scores[player_id][1]
                         })
             
             table_round_score = sum(p['roundScore'] for p in table_players)
@@ -142,63 +156,45 @@ def debug_olivia_ranking(tournament_id):
     
     active_players = [p for p in players.values() if not p.get('eliminated', False)]
     
+    # Index the seating once, rather than scanning it twice for every player.
+    # Both maps stay empty when no round has completed, leaving every table
+    # score at 0 without any lookups.
+    player_to_table = {}
+    table_to_players = defaultdict(list)
+    
+    for player_id, table_id in parts_data:
+        player_to_table.setdefault(player_id, table_id)
+        table_to_players[table_id].append(player_id)
+    
     # Calculate scores for all players
     for player in active_players:
-        # Tournament score
-        player['_tournamentScore'] = sum(
-            event.get('delta', 0) * rounds_map.get(event.get('roundNumber'), {}).get('scoreMultiplier', 1)
-            for event in player.get('scoreEvents', [])
-        )
-        
-        # Round score
-        player['_roundScore'] = sum(
-            event.get('delta', 0) * rounds_map.get(last_completed_round, {}).get('scoreMultiplier', 1)
-            for event in player.get('scoreEvents', [])
-            if event.get('roundNumber') == last_completed_round
-        )
+        # Tournament and round score
+        player['_tournamentScore'], player['_roundScore'] = player_scores[player['id']]
         
         # Last win timestamp
         last_win = player.get('lastWinAt')
         player['_lastWin'] = last_win.timestamp() if last_win else 0
         
-        # Table round score - need to get from participants
-        player['_tableRoundScore'] = 0
+        # Table round score - sum all players' round scores at this player's table
+        player_table_id = player_to_table.get(player['id'])
+        table_mates = table_to_players.get(player_table_id, ()) if player_table_id else ()
+        player['_tableRoundScore'] = sum(
+            player_scores[other_player_id][1]
+            for other_player_id in table_mates
+            if other_player_id in player_scores
+        )
         
-        if last_completed_round > 0:
-            round_id = rounds_map[last_completed_round]['id']
-            participants_ref = tournament_ref.collection('rounds').document(round_id).collection('participants')
-            
-            # Find this player's table
-            player_table_id = None
-            for part_doc in participants_ref.stream():
-                part_data = part_doc.to_dict()
-                if part_data.get('playerId') == player['id']:
-                    player_table_id = part_data.get('tableId')
-                    break
-            
-            if player_table_id:
-                # Sum all players' round scores at this table
-                for part_doc in participants_ref.stream():
-                    part_data = part_doc.to_dict()
-                    if part_data.get('tableId') == player_table_id:
-                        other_player_id = part_data.get('playerId')
-                        other_player = players.get(other_player_id)
-                        if other_player:
-                            other_round_score = sum(
-                                event.get('delta', 0) * rounds_map.get(last_completed_round, {}).get('scoreMultiplier', 1)
-                                for event in other_player.get('scoreEvents', [])
-                                if event.get('roundNumber') == last_completed_round
-                            )
-                            player['_tableRoundScore'] += other_round_score
+        # Ranking key, built once here instead of inside the sort
+        player['_sort_key'] = (
+            -player['_tournamentScore'],
+            -player['_roundScore'],
+            -player['_lastWin'],
+            -player['_tableRoundScore'],
+            player.get('name', '')
+        )
     
     # Sort by ranking algorithm
-    sorted_players = sorted(active_players, key=lambda p: (
-        -p['_tournamentScore'],
-        -p['_roundScore'],
-        -p['_lastWin'],
-        -p['_tableRoundScore'],
-        p.get('name', '')
-    ))
+    sorted_players = sorted(active_players, key=itemgetter('_sort_key'))
     
     # Display top 10 and around Olivia
     print(f"{'Rank':<6} {'Name':<25} {'T.Score':<10} {'R.Score':<10} {'Last Win':<12} {'Table Score':<12}")
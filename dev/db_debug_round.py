@@ -4,10 +4,11 @@ Debug round data - show player vs participant wins
 """
 
 from setup_firebase import init_firebase
+from google.cloud.firestore_v1.base_query import FieldFilter
 import sys
 
-def debug_round(tournament_id):
-    db = init_firebase()
+def debug_round(tournament_id, db=None):
+    db = db or init_firebase()
     
     # Get tournament
     t_doc = db.collection('tournaments').document(tournament_id).get()
@@ -24,14 +25,11 @@ def debug_round(tournament_id):
         print("\n❌ No rounds started yet")
         return
     
-    # Find the round document
-    rounds = list(db.collection('tournaments', tournament_id, 'rounds').stream())
-    round_doc = None
-    for r in rounds:
-        r_data = r.to_dict()
-        if r_data.get('roundNumber') == current_round:
-            round_doc = r
-            break
+    # Find the round document (filtered server-side; only one is needed)
+    rounds_query = (db.collection('tournaments', tournament_id, 'rounds')
+                    .where(filter=FieldFilter('roundNumber', '==', current_round))
+                    .limit(1))
+    round_doc = next(iter(rounds_query.stream()), None)
     
     if not round_doc:
         print(f"\n❌ Round {current_round} document not found")
@@ -40,17 +38,17 @@ def debug_round(tournament_id):
     print(f"\n📊 Round {current_round} Analysis:")
     print("="*80)
     
-    # Get all players
+    # Get all players (only the fields the report shows)
     players = {}
-    for p in db.collection('tournaments', tournament_id, 'players').stream():
+    for p in db.collection('tournaments', tournament_id, 'players').select(['name', 'wins']).stream():
         p_data = p.to_dict()
         players[p.id] = {
             'name': p_data.get('name'),
             'current_wins': p_data.get('wins', 0)
         }
     
-    # Get all participants
-    participants = list(db.collection('tournaments', tournament_id, 'rounds', round_doc.id, 'participants').stream())
+    # Get all participants, streamed straight into the report
+    participants_ref = db.collection('tournaments', tournament_id, 'rounds', round_doc.id, 'participants')
     
     print(f"{'Player':<25} {'Start Wins':<12} {'Current Wins':<14} {'Round Wins':<12}")
     print("-"*80)
@@ -58,7 +56,7 @@ def debug_round(tournament_id):
     total_start = 0
     total_current = 0
     
-    for part_doc in participants:
+    for part_doc in participants_ref.select(['playerId', 'wins']).stream():
         part_data = part_doc.to_dict()
         player_id = part_data.get('playerId')
         snapshot_wins = part_data.get('wins', 0)
@@ -5,98 +5,132 @@ Export your Firebase data to JSON for backup
 """
 
 from setup_firebase import init_firebase
+from export_utils import export_docs, open_export, write_json_array, write_json_value
 import json
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-def export_tournament(tournament_id, output_file=None):
-    """Export a specific tournament to JSON"""
-    db = init_firebase()
+# Concurrent subcollection fetches per export
+EXPORT_WORKERS = 20
+
+def _write_export(output_file, tournament_id, t_data, players, tables, rounds):
+    """
+    Write one tournament export file
+    
+    players and tables are iterables of document snapshots; rounds yields
+    (round snapshot, participant snapshots) pairs. Each is consumed lazily,
+    so callers can hand in live streams or pending fetches.
+    """
+    def export_rounds():
+        for round_doc, participants in rounds:
+            yield {
+                'id': round_doc.id,
+                **round_doc.to_dict(),
+                'participants': list(export_docs(participants))
+            }
+    
+    # Stream documents to disk as they arrive instead of building the whole
+    # export in memory
+    with open_export(output_file) as f:
+        f.write('{\n  "tournament": ')
+        write_json_value(f, t_data, 1)
+        f.write(f',\n  "tournament_id": {json.dumps(tournament_id)}')
+        f.write(f',\n  "exported_at": {json.dumps(datetime.now().isoformat())}')
+        f.write(',\n  "players": ')
+        players_count = write_json_array(f, export_docs(players))
+        f.write(',\n  "tables": ')
+        tables_count = write_json_array(f, export_docs(tables))
+        f.write(',\n  "rounds": ')
+        rounds_count = write_json_array(f, export_rounds())
+        f.write('\n}')
     
-    tournament_ref = db.collection('tournaments').document(tournament_id)
-    tournament = tournament_ref.get()
+    print(f"✅ Exported tournament to: {output_file}")
+    print(f"   Players: {players_count}")
+    print(f"   Tables: {tables_count}")
+    print(f"   Rounds: {rounds_count}")
+
+def _default_output_file(tournament_id, timestamp=None):
+    if timestamp is None:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return f"exports/tournament_{tournament_id}_{timestamp}.json"
+
+def export_tournament(tournament_id, output_file=None, db=None, t_data=None):
+    """
+    Export a specific tournament to JSON
     
-    if not tournament.exists:
-        print(f"❌ Tournament {tournament_id} not found")
-        return
+    Callers that already hold the tournament's data can pass it as t_data
+    to skip re-reading the tournament document.
+    """
+    db = db or init_firebase()
     
-    t_data = tournament.to_dict()
-    
-    # Convert Firestore timestamps to strings
-    def convert_timestamps(obj):
-        if isinstance(obj, dict):
-            return {k: convert_timestamps(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [convert_timestamps(item) for item in obj]
-        elif hasattr(obj, 'isoformat'):  # datetime/timestamp
-            return obj.isoformat()
-        else:
-            return obj
-    
-    export_data = {
-        'tournament': convert_timestamps(t_data),
-        'tournament_id': tournament_id,
-        'exported_at': datetime.now().isoformat(),
-        'players': [],
-        'tables': [],
-        'rounds': []
-    }
-    
-    # Export players
-    players = list(db.collection('tournaments', tournament_id, 'players').stream())
-    for player in players:
-        export_data['players'].append({
-            'id': player.id,
-            **convert_timestamps(player.to_dict())
-        })
-    
-    # Export tables
-    tables = list(db.collection('tournaments', tournament_id, 'tables').stream())
-    for table in tables:
-        export_data['tables'].append({
-            'id': table.id,
-            **convert_timestamps(table.to_dict())
-        })
-    
-    # Export rounds
-    rounds = list(db.collection('tournaments', tournament_id, 'rounds').stream())
-    for round_doc in rounds:
-        round_data = {
-            'id': round_doc.id,
-            **convert_timestamps(round_doc.to_dict()),
-            'participants': []
-        }
+    if t_data is None:
+        tournament = db.collection('tournaments').document(tournament_id).get()
         
-        # Export participants
-        participants = list(db.collection('tournaments', tournament_id, 'rounds', round_doc.id, 'participants').stream())
-        for participant in participants:
-            round_data['participants'].append({
-                'id': participant.id,
-                **convert_timestamps(participant.to_dict())
-            })
+        if not tournament.exists:
+            print(f"❌ Tournament {tournament_id} not found")
+            return
         
-        export_data['rounds'].append(round_data)
+        t_data = tournament.to_dict()
     
-    # Save to file
-    if output_file is None:
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_file = f"exports/tournament_{tournament_id}_{timestamp}.json"
+    players_ref = db.collection('tournaments', tournament_id, 'players')
+    tables_ref = db.collection('tournaments', tournament_id, 'tables')
+    rounds_ref = db.collection('tournaments', tournament_id, 'rounds')
     
-    import os
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    def fetch_participants(round_doc):
+        return list(rounds_ref.document(round_doc.id).collection('participants').stream())
     
-    with open(output_file, 'w') as f:
-        json.dump(export_data, f, indent=2)
+    def fetch_rounds(executor):
+        # Queue every round's participant fetch as soon as the rounds are known
+        round_docs = list(rounds_ref.stream())
+        return [(round_doc, executor.submit(fetch_participants, round_doc)) for round_doc in round_docs]
     
-    print(f"✅ Exported tournament to: {output_file}")
-    print(f"   Players: {len(export_data['players'])}")
-    print(f"   Tables: {len(export_data['tables'])}")
-    print(f"   Rounds: {len(export_data['rounds'])}")
+    def pending_tables(tables_future):
+        yield from tables_future.result()
+    
+    def pending_rounds(rounds_future):
+        # Rounds are written in their original order as each fetch completes
+        for round_doc, participants_future in rounds_future.result():
+            yield round_doc, participants_future.result()
+    
+    if output_file is None:
+        output_file = _default_output_file(tournament_id)
+    
+    # Tables, rounds and participants are fetched in the background while
+    # players are being written
+    with ThreadPoolExecutor(max_workers=EXPORT_WORKERS) as executor:
+        tables_future = executor.submit(lambda: list(tables_ref.stream()))
+        rounds_future = executor.submit(fetch_rounds, executor)
+        _write_export(
+            output_file, tournament_id, t_data,
+            players_ref.stream(),
+            pending_tables(tables_future),
+            pending_rounds(rounds_future)
+        )
+
+def _tournament_id_of(doc, depth):
+    """Tournament ID owning a subcollection doc nested depth collections deep"""
+    ref = doc.reference
+    for _ in range(depth):
+        ref = ref.parent.parent
+    return ref.id if ref.parent.id == 'tournaments' else None
 
 def export_all():
     """Export all tournaments"""
     db = init_firebase()
     
-    tournaments = list(db.collection('tournaments').stream())
+    # The tournament list and four collection-group queries fetch every
+    # subcollection of every tournament over one client, instead of three
+    # queries per tournament plus one per round. They're independent, so
+    # run them concurrently.
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        tournaments_future = executor.submit(lambda: list(db.collection('tournaments').stream()))
+        group_futures = {
+            name: executor.submit(lambda name=name: list(db.collection_group(name).stream()))
+            for name in ('players', 'tables', 'rounds', 'participants')
+        }
+        tournaments = tournaments_future.result()
+        group_docs = {name: future.result() for name, future in group_futures.items()}
     
     if len(tournaments) == 0:
         print("No tournaments to export.")
@@ -106,10 +140,33 @@ def export_all():
     
     print(f"\n📦 Exporting {len(tournaments)} tournament(s)...\n")
     
+    # Bucket documents by owning tournament (and round) from their paths
+    players = defaultdict(list)
+    tables = defaultdict(list)
+    rounds = defaultdict(list)
+    participants = defaultdict(list)
+    
+    for doc in group_docs['players']:
+        players[_tournament_id_of(doc, 1)].append(doc)
+    for doc in group_docs['tables']:
+        tables[_tournament_id_of(doc, 1)].append(doc)
+    for doc in group_docs['rounds']:
+        rounds[_tournament_id_of(doc, 1)].append(doc)
+    for doc in group_docs['participants']:
+        participants[(_tournament_id_of(doc, 2), doc.reference.parent.parent.id)].append(doc)
+    del group_docs
+    
     for tournament in tournaments:
         t_data = tournament.to_dict()
         print(f"Exporting: {t_data.get('name', 'Unnamed')}...")
-        export_tournament(tournament.id)
+        tournament_rounds = [
+            (round_doc, participants[(tournament.id, round_doc.id)])
+            for round_doc in rounds[tournament.id]
+        ]
+        _write_export(
+            _default_output_file(tournament.id, timestamp), tournament.id, t_data,
+            players[tournament.id], tables[tournament.id], tournament_rounds
+        )
     
     print(f"\n✅ All tournaments exported to exports/\n")
 
@@ -4,17 +4,45 @@ Export Complete Tournament State to JSON
 Exports everything needed to restore a tournament to exact state
 """
 
-from setup_firebase import init_firebase
+from setup_firebase import init_firebase_async
+from export_utils import export_docs, open_export, write_json_array, write_json_value
+import asyncio
 import json
 from datetime import datetime
 import sys
 
-def export_tournament_state(tournament_id, output_file=None):
-    """Export complete tournament state including all subcollections"""
-    db = init_firebase()
+EXPORT_VERSION = '1.0'
+
+async def _collect(query):
+    return [doc async for doc in query.stream()]
+
+async def _load_state(db, tournament_id):
+    """
+    Fetch a tournament and all its subcollections
     
+    The tournament, players, tables and rounds are independent reads, so
+    they're issued together; every round's participants then fan out at
+    once. Returns (tournament, players, tables, [(round, participants)]).
+    """
     tournament_ref = db.collection('tournaments').document(tournament_id)
-    tournament = tournament_ref.get()
+    
+    tournament, players, tables, rounds = await asyncio.gather(
+        tournament_ref.get(),
+        _collect(tournament_ref.collection('players')),
+        _collect(tournament_ref.collection('tables')),
+        _collect(tournament_ref.collection('rounds'))
+    )
+    
+    participants = await asyncio.gather(
+        *(_collect(round_doc.reference.collection('participants')) for round_doc in rounds)
+    )
+    
+    return tournament, players, tables, list(zip(rounds, participants))
+
+async def _export_tournament_state(tournament_id, output_file, async_db):
+    db = async_db or init_firebase_async()
+    
+    tournament, players, tables, rounds = await _load_state(db, tournament_id)
     
     if not tournament.exists:
         print(f"❌ Tournament {tournament_id} not found")
@@ -22,66 +50,17 @@ def export_tournament_state(tournament_id, output_file=None):
     
     t_data = tournament.to_dict()
     
-    # Convert Firestore timestamps to ISO strings
-    def convert_timestamp(obj):
-        if isinstance(obj, dict):
-            return {k: convert_timestamp(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [convert_timestamp(item) for item in obj]
-        elif hasattr(obj, 'isoformat'):
-            return obj.isoformat()
-        else:
-            return obj
-    
     print(f"\n📦 Exporting tournament state: {t_data.get('name', 'Unnamed')}")
     
-    export_data = {
-        'export_version': '1.0',
-        'exported_at': datetime.now().isoformat(),
-        'tournament_id': tournament_id,
-        'tournament': convert_timestamp(t_data),
-        'players': [],
-        'tables': [],
-        'rounds': []
-    }
-    
-    # Export all players
-    players = list(db.collection('tournaments', tournament_id, 'players').stream())
-    print(f"   Exporting {len(players)} players...")
-    for player in players:
-        export_data['players'].append({
-            'id': player.id,
-            **convert_timestamp(player.to_dict())
-        })
+    total_participants = sum(len(participants) for _, participants in rounds)
     
-    # Export all tables
-    tables = list(db.collection('tournaments', tournament_id, 'tables').stream())
-    print(f"   Exporting {len(tables)} tables...")
-    for table in tables:
-        export_data['tables'].append({
-            'id': table.id,
-            **convert_timestamp(table.to_dict())
-        })
-    
-    # Export all rounds with participants
-    rounds = list(db.collection('tournaments', tournament_id, 'rounds').stream())
-    print(f"   Exporting {len(rounds)} rounds...")
-    for round_doc in rounds:
-        round_data = {
-            'id': round_doc.id,
-            **convert_timestamp(round_doc.to_dict()),
-            'participants': []
-        }
-        
-        # Export participants
-        participants = list(db.collection('tournaments', tournament_id, 'rounds', round_doc.id, 'participants').stream())
-        for participant in participants:
-            round_data['participants'].append({
-                'id': participant.id,
-                **convert_timestamp(participant.to_dict())
-            })
-        
-        export_data['rounds'].append(round_data)
+    def export_rounds():
+        for round_doc, participants in rounds:
+            yield {
+                'id': round_doc.id,
+                **round_doc.to_dict(),
+                'participants': list(export_docs(participants))
+            }
     
     # Save to file
     if output_file is None:
@@ -89,22 +68,49 @@ def export_tournament_state(tournament_id, output_file=None):
         safe_name = t_data.get('name', 'tournament').replace(' ', '_').lower()
         output_file = f"exports/{safe_name}_{timestamp}.json"
     
-    import os
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    
-    with open(output_file, 'w') as f:
-        json.dump(export_data, f, indent=2)
+    # Every document is already in memory (gathered concurrently above, so
+    # this export is not constant-memory like db_export.py's); serializing
+    # one at a time just avoids also holding the whole export as one string
+    with open_export(output_file) as f:
+        f.write(f'{{\n  "export_version": {json.dumps(EXPORT_VERSION)}')
+        f.write(f',\n  "exported_at": {json.dumps(datetime.now().isoformat())}')
+        f.write(f',\n  "tournament_id": {json.dumps(tournament_id)}')
+        f.write(',\n  "tournament": ')
+        write_json_value(f, t_data, 1)
+        
+        f.write(',\n  "players": ')
+        players_count = write_json_array(f, export_docs(players))
+        print(f"   Exported {players_count} players")
+        
+        f.write(',\n  "tables": ')
+        tables_count = write_json_array(f, export_docs(tables))
+        print(f"   Exported {tables_count} tables")
+        
+        f.write(',\n  "rounds": ')
+        rounds_count = write_json_array(f, export_rounds())
+        print(f"   Exported {rounds_count} rounds")
+        f.write('\n}')
     
     print(f"\n✅ Exported complete state to: {output_file}")
-    print(f"   Players: {len(export_data['players'])}")
-    print(f"   Tables: {len(export_data['tables'])}")
-    print(f"   Rounds: {len(export_data['rounds'])}")
-    total_participants = sum(len(r['participants']) for r in export_data['rounds'])
+    print(f"   Players: {players_count}")
+    print(f"   Tables: {tables_count}")
+    print(f"   Rounds: {rounds_count}")
     print(f"   Participants: {total_participants}")
     print()
     
     return output_file
 
+def export_tournament_state(tournament_id, output_file=None, async_db=None):
+    """
+    Export complete tournament state including all subcollections
+    
+    Unlike the other scripts' db argument, async_db takes an async Firestore
+    client (see init_firebase_async), and one that hasn't been used on
+    another event loop; each call runs its own loop. Omit it to get a fresh
+    client per call.
+    """
+    return asyncio.run(_export_tournament_state(tournament_id, output_file, async_db))
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("\n📦 Export Tournament State")
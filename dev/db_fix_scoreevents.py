@@ -6,16 +6,24 @@ This fixes a critical bug where scoreEvents were missing the roundNumber field,
 causing round scores and table round scores to calculate as 0.
 """
 
-import firebase_admin
-from firebase_admin import credentials, firestore
+from setup_firebase import init_firebase, WRITE_RETRY
 from datetime import datetime
+import bisect
+from concurrent.futures import ThreadPoolExecutor
 
-# Initialize Firebase
-if not firebase_admin._apps:
-    cred = credentials.Certificate('serviceAccountKey.json')
-    firebase_admin.initialize_app(cred)
+# Shared Firestore client
+db = init_firebase()
 
-db = firestore.client()
+# Updates per batched commit, comfortably under Firestore's 500-op limit
+MAX_BATCH_WRITES = 400
+
+# Concurrent per-round participant fetches
+FETCH_WORKERS = 16
+
+# The only fields the migration reads from players and participants. Every
+# document still has to be scanned: the docs needing a fix are exactly the
+# legacy ones written before any marker could have been set on them.
+EVENT_FIELDS = ['name', 'scoreEvents']
 
 def fix_scoreevents_for_tournament(tournament_id, dry_run=True):
     """
@@ -63,14 +71,49 @@ def fix_scoreevents_for_tournament(tournament_id, dry_run=True):
         end = r['endedAt'].strftime('%Y-%m-%d %H:%M:%S') if r['endedAt'] else 'Not ended'
         print(f"  Round {r['roundNumber']}: {start} to {end} ({r['status']})")
     
+    # Started rounds ordered by start time, so an event's round is found by
+    # binary search on its timestamp instead of scanning every round
+    started_rounds = sorted((r for r in rounds if r['startedAt']), key=lambda r: r['startedAt'])
+    round_starts = [r['startedAt'] for r in started_rounds]
+    
+    # Every round's participants are fetched concurrently in the background
+    # while the players are processed, rather than one stream after another
+    # later on. Shutting down without waiting lets the queued fetches finish.
+    executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+    participant_futures = {
+        r['id']: executor.submit(
+            lambda round_id=r['id']: list(rounds_ref.document(round_id).collection('participants').select(EVENT_FIELDS).stream())
+        )
+        for r in rounds
+    }
+    executor.shutdown(wait=False)
+    
     # Get all players
     players_ref = tournament_ref.collection('players')
     players_updated = 0
     events_fixed = 0
     
+    # Player and participant updates are queued into batched writes and
+    # committed every MAX_BATCH_WRITES, instead of one round-trip each.
+    # Each update rewrites the whole scoreEvents array on purpose: swapping
+    # single entries with ArrayRemove/ArrayUnion would move fixed events to
+    # the end of the array and collapse identical events into one.
+    batch = db.batch()
+    batch_count = 0
+    
+    def queue_update(ref, data):
+        nonlocal batch, batch_count
+        batch.update(ref, data)
+        batch_count += 1
+        if batch_count >= MAX_BATCH_WRITES:
+            # Whole-array updates are idempotent, so retrying is safe
+            batch.commit(retry=WRITE_RETRY)
+            batch = db.batch()
+            batch_count = 0
+    
     print(f"\nProcessing players...\n")
     
-    for player_doc in players_ref.stream():
+    for player_doc in players_ref.select(EVENT_FIELDS).stream():
         player_id = player_doc.id
         player_data = player_doc.to_dict()
         player_name = player_data.get('name', 'Unknown')
@@ -89,14 +132,15 @@ def fix_scoreevents_for_tournament(tournament_id, dry_run=True):
                 event_time = event.get('timestamp')
                 matched_round = None
                 
-                for r in rounds:
-                    if r['startedAt'] and event_time:
-                        # Event belongs to this round if timestamp is after round start
-                        # and (before round end OR round hasn't ended yet)
-                        if event_time >= r['startedAt']:
-                            if r['endedAt'] is None or event_time <= r['endedAt']:
-                                matched_round = r['roundNumber']
-                                break
+                if event_time:
+                    # Event belongs to the latest round started at or before its
+                    # timestamp, if it's before that round's end OR the round
+                    # hasn't ended yet
+                    idx = bisect.bisect_right(round_starts, event_time) - 1
+                    if idx >= 0:
+                        r = started_rounds[idx]
+                        if r['endedAt'] is None or event_time <= r['endedAt']:
+                            matched_round = r['roundNumber']
                 
                 if matched_round is not None:
                     event['roundNumber'] = matched_round
@@ -113,7 +157,7 @@ def fix_scoreevents_for_tournament(tournament_id, dry_run=True):
             
             if not dry_run:
                 # Update player document
-                player_doc.reference.update({
+                queue_update(player_doc.reference, {
                     'scoreEvents': updated_events
                 })
                 print(f"    ✅ Updated player: {player_name}")
@@ -125,9 +169,8 @@ def fix_scoreevents_for_tournament(tournament_id, dry_run=True):
     for round_info in rounds:
         round_id = round_info['id']
         round_number = round_info['roundNumber']
-        participants_ref = tournament_ref.collection('rounds').document(round_id).collection('participants')
         
-        for participant_doc in participants_ref.stream():
+        for participant_doc in participant_futures[round_id].result():
             participant_data = participant_doc.to_dict()
             participant_name = participant_data.get('name', 'Unknown')
             score_events = participant_data.get('scoreEvents', [])
@@ -151,11 +194,14 @@ def fix_scoreevents_for_tournament(tournament_id, dry_run=True):
                 participants_updated += 1
                 
                 if not dry_run:
-                    participant_doc.reference.update({
+                    queue_update(participant_doc.reference, {
                         'scoreEvents': updated_events
                     })
                     print(f"  - Round {round_number} participant: {participant_name}")
     
+    if batch_count:
+        batch.commit(retry=WRITE_RETRY)
+    
     print(f"\n{'='*80}")
     print(f"SUMMARY:")
     print(f"  - Players updated: {players_updated}")
@@ -4,12 +4,58 @@ Import Complete Tournament State from JSON
 Restore a tournament to exact state from exported JSON
 """
 
-from setup_firebase import init_firebase
-from firebase_admin import firestore
+from setup_firebase import init_firebase, WRITE_RETRY
 import json
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# Concurrent batched commits during import
+IMPORT_WORKERS = 40
+
+# Writes per batched commit, under Firestore's 500-op limit
+MAX_BATCH_WRITES = 400
+
+# Fields exported as ISO strings that are restored as Firestore timestamps
+TS_KEYS = frozenset({
+    'createdAt', 'completedAt', 'startedAt', 'endedAt', 'registeredAt',
+    'lastWinAt', 'snapshotAt', 'timestamp', 'addedAt'
+})
+
+def convert_iso_to_timestamp(obj):
+    """
+    Copy exported data, parsing ISO strings under TS_KEYS back into datetimes
+    
+    Nested dicts and lists are walked with an explicit stack rather than
+    recursion. The SDK writes datetimes as native Firestore timestamps.
+    """
+    pending = []
+    
+    def copy(value):
+        # Containers are copied now and their contents converted when popped
+        if isinstance(value, dict):
+            value = dict(value)
+        elif isinstance(value, list):
+            value = list(value)
+        else:
+            return value
+        pending.append(value)
+        return value
+    
+    result = copy(obj)
+    while pending:
+        container = pending.pop()
+        if isinstance(container, dict):
+            for k, v in container.items():
+                if k in TS_KEYS and isinstance(v, str) and v:
+                    container[k] = datetime.fromisoformat(v.replace('Z', '+00:00'))
+                else:
+                    container[k] = copy(v)
+        else:
+            for i, v in enumerate(container):
+                container[i] = copy(v)
+    return result
+
 def import_tournament_state(json_file, new_tournament_id=None):
     """Import complete tournament state from JSON"""
     db = init_firebase()
@@ -49,103 +95,96 @@ def import_tournament_state(json_file, new_tournament_id=None):
     
     print(f"\n⏳ Creating tournament: {tournament_id}")
     
-    # Convert ISO strings back to timestamps where needed
-    def convert_iso_to_timestamp(obj):
-        if isinstance(obj, dict):
-            result = {}
-            for k, v in obj.items():
-                if k in ['createdAt', 'startedAt', 'endedAt', 'registeredAt', 'lastWinAt', 'snapshotAt']:
-                    if v and isinstance(v, str):
-                        # Use server timestamp for current time, or skip for null
-                        result[k] = firestore.SERVER_TIMESTAMP if v else None
-                    else:
-                        result[k] = v
-                else:
-                    result[k] = convert_iso_to_timestamp(v)
-            return result
-        elif isinstance(obj, list):
-            return [convert_iso_to_timestamp(item) for item in obj]
-        else:
-            return obj
+    players_ref = db.collection('tournaments', tournament_id, 'players')
+    tables_ref = db.collection('tournaments', tournament_id, 'tables')
+    rounds_ref = db.collection('tournaments', tournament_id, 'rounds')
+    
+    # Document IDs are generated client-side, so every old-to-new ID mapping
+    # is known before anything is written
+    player_id_map = {p['id']: players_ref.document().id for p in import_data['players']}
+    table_id_map = {t['id']: tables_ref.document().id for t in import_data['tables']}
+    
+    def commit_sets(writes):
+        batch = db.batch()
+        for ref, data in writes:
+            batch.set(ref, data)
+        # Every write is an idempotent set, so retrying after a timeout is safe
+        batch.commit(retry=WRITE_RETRY)
+    
+    def write_all(executor, writes):
+        # Pack the writes into batched commits and send those concurrently
+        chunks = [writes[i:i + MAX_BATCH_WRITES] for i in range(0, len(writes), MAX_BATCH_WRITES)]
+        list(executor.map(commit_sets, chunks))
     
     try:
         # Create tournament
         clean_tournament = convert_iso_to_timestamp(tournament_data)
-        tournament_ref.set(clean_tournament)
+        tournament_ref.set(clean_tournament, retry=WRITE_RETRY)
         print(f"   ✅ Tournament created")
         
-        # Create players
-        print(f"\n⏳ Creating {len(import_data['players'])} players...")
-        player_id_map = {}  # Map old IDs to new IDs
-        for player_data in import_data['players']:
-            old_id = player_data['id']
-            clean_player = {k: v for k, v in player_data.items() if k != 'id'}
-            clean_player = convert_iso_to_timestamp(clean_player)
-            
-            player_ref = db.collection('tournaments', tournament_id, 'players').document()
-            player_ref.set(clean_player)
-            player_id_map[old_id] = player_ref.id
-        print(f"   ✅ {len(import_data['players'])} players created")
-        
-        # Create tables (update player references)
-        print(f"\n⏳ Creating {len(import_data['tables'])} tables...")
-        table_id_map = {}
-        for table_data in import_data['tables']:
-            old_id = table_data['id']
-            clean_table = {k: v for k, v in table_data.items() if k != 'id'}
-            clean_table = convert_iso_to_timestamp(clean_table)
-            
-            # Update player IDs in table
-            if 'players' in clean_table:
-                clean_table['players'] = [player_id_map.get(pid, pid) for pid in clean_table['players']]
-            if 'positions' in clean_table:
-                clean_table['positions'] = {player_id_map.get(pid, pid): pos for pid, pos in clean_table['positions'].items()}
-            
-            table_ref = db.collection('tournaments', tournament_id, 'tables').document()
-            table_ref.set(clean_table)
-            table_id_map[old_id] = table_ref.id
-        print(f"   ✅ {len(import_data['tables'])} tables created")
-        
-        # Update players with new table IDs
-        print(f"\n⏳ Updating player table assignments...")
-        for player_data in import_data['players']:
-            old_player_id = player_data['id']
-            new_player_id = player_id_map[old_player_id]
-            
-            if player_data.get('tableId'):
-                old_table_id = player_data['tableId']
-                new_table_id = table_id_map.get(old_table_id)
-                if new_table_id:
-                    db.collection('tournaments', tournament_id, 'players').document(new_player_id).update({
-                        'tableId': new_table_id
-                    })
-        
-        # Create rounds with participants
-        print(f"\n⏳ Creating {len(import_data['rounds'])} rounds...")
-        for round_data in import_data['rounds']:
-            clean_round = {k: v for k, v in round_data.items() if k not in ['id', 'participants']}
-            clean_round = convert_iso_to_timestamp(clean_round)
-            
-            round_ref = db.collection('tournaments', tournament_id, 'rounds').document()
-            round_ref.set(clean_round)
+        # Writes within each phase are independent, so keep many in flight
+        with ThreadPoolExecutor(max_workers=IMPORT_WORKERS) as executor:
+            # Create players, with their new table IDs filled in up front
+            # rather than patched in by a second round of updates
+            print(f"\n⏳ Creating {len(import_data['players'])} players...")
+            player_writes = []
+            for player_data in import_data['players']:
+                clean_player = {k: v for k, v in player_data.items() if k != 'id'}
+                clean_player = convert_iso_to_timestamp(clean_player)
+                
+                if clean_player.get('tableId'):
+                    old_table_id = clean_player['tableId']
+                    clean_player['tableId'] = table_id_map.get(old_table_id, old_table_id)
+                
+                player_writes.append((players_ref.document(player_id_map[player_data['id']]), clean_player))
+            write_all(executor, player_writes)
+            print(f"   ✅ {len(import_data['players'])} players created")
             
-            # Create participants
-            for participant_data in round_data['participants']:
-                clean_participant = {k: v for k, v in participant_data.items() if k != 'id'}
-                clean_participant = convert_iso_to_timestamp(clean_participant)
+            # Create tables (update player references)
+            print(f"\n⏳ Creating {len(import_data['tables'])} tables...")
+            table_writes = []
+            for table_data in import_data['tables']:
+                clean_table = {k: v for k, v in table_data.items() if k != 'id'}
+                clean_table = convert_iso_to_timestamp(clean_table)
+                
+                # Update player IDs in table
+                if 'players' in clean_table:
+                    clean_table['players'] = [player_id_map.get(pid, pid) for pid in clean_table['players']]
+                if 'positions' in clean_table:
+                    clean_table['positions'] = {player_id_map.get(pid, pid): pos for pid, pos in clean_table['positions'].items()}
                 
-                # Update player ID reference
-                if 'playerId' in clean_participant:
-                    old_player_id = clean_participant['playerId']
-                    clean_participant['playerId'] = player_id_map.get(old_player_id, old_player_id)
+                table_writes.append((tables_ref.document(table_id_map[table_data['id']]), clean_table))
+            write_all(executor, table_writes)
+            print(f"   ✅ {len(import_data['tables'])} tables created")
+            
+            # Create rounds with participants
+            print(f"\n⏳ Creating {len(import_data['rounds'])} rounds...")
+            round_writes = []
+            for round_data in import_data['rounds']:
+                clean_round = {k: v for k, v in round_data.items() if k not in ['id', 'participants']}
+                clean_round = convert_iso_to_timestamp(clean_round)
                 
-                # Update table ID reference
-                if 'tableId' in clean_participant and clean_participant['tableId']:
-                    old_table_id = clean_participant['tableId']
-                    clean_participant['tableId'] = table_id_map.get(old_table_id, old_table_id)
+                round_ref = rounds_ref.document()
+                round_writes.append((round_ref, clean_round))
+                participants_ref = round_ref.collection('participants')
                 
-                participant_ref = db.collection('tournaments', tournament_id, 'rounds', round_ref.id, 'participants').document()
-                participant_ref.set(clean_participant)
+                # Create participants
+                for participant_data in round_data['participants']:
+                    clean_participant = {k: v for k, v in participant_data.items() if k != 'id'}
+                    clean_participant = convert_iso_to_timestamp(clean_participant)
+                    
+                    # Update player ID reference
+                    if 'playerId' in clean_participant:
+                        old_player_id = clean_participant['playerId']
+                        clean_participant['playerId'] = player_id_map.get(old_player_id, old_player_id)
+                    
+                    # Update table ID reference
+                    if 'tableId' in clean_participant and clean_participant['tableId']:
+                        old_table_id = clean_participant['tableId']
+                        clean_participant['tableId'] = table_id_map.get(old_table_id, old_table_id)
+                    
+                    round_writes.append((participants_ref.document(), clean_participant))
+            write_all(executor, round_writes)
         
         print(f"   ✅ {len(import_data['rounds'])} rounds created")
         
@@ -6,8 +6,10 @@ Randomly simulate games for a tournament round to generate realistic test data
 
 from setup_firebase import init_firebase
 from firebase_admin import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
 import sys
 import random
+from collections import Counter
 from datetime import datetime, timedelta
 
 def simulate_round_games(tournament_id, min_games_per_table=4, max_games_per_table=6):
@@ -36,7 +38,8 @@ def simulate_round_games(tournament_id, min_games_per_table=4, max_games_per_tab
     print(f"\n🎲 Simulating games for Round {current_round} of '{t_data.get('name', 'Unnamed')}'")
     
     # Get all tables
-    tables = list(db.collection('tournaments', tournament_id, 'tables').stream())
+    tables_query = db.collection('tournaments', tournament_id, 'tables').select(['tableNumber', 'players'])
+    tables = list(tables_query.stream())
     
     if len(tables) == 0:
         print("❌ No tables found. Assign players to tables first.")
@@ -56,25 +59,23 @@ def simulate_round_games(tournament_id, min_games_per_table=4, max_games_per_tab
     
     total_games = 0
     
-    # Find current round doc once
-    rounds = list(db.collection('tournaments', tournament_id, 'rounds').stream())
-    round_doc_id = None
-    for round_doc in rounds:
-        round_data = round_doc.to_dict()
-        if round_data.get('roundNumber') == current_round and round_data.get('status') == 'in_progress':
-            round_doc_id = round_doc.id
-            break
-    
-    if not round_doc_id:
+    # Make sure the current round's document is in progress, filtered
+    # server-side. Equality-only filters are served from the automatic
+    # single-field indexes, so no composite index is needed.
+    rounds_query = (db.collection('tournaments', tournament_id, 'rounds')
+                    .where(filter=FieldFilter('roundNumber', '==', current_round))
+                    .where(filter=FieldFilter('status', '==', 'in_progress'))
+                    .select([])  # only existence matters
+                    .limit(1))
+    round_doc = next(iter(rounds_query.stream()), None)
+    
+    if not round_doc:
         print(f"❌ Could not find round {current_round} document")
         return
     
-    # Build participant ID map once
-    participant_map = {}  # playerId -> participantDocId
-    participants = list(db.collection('tournaments', tournament_id, 'rounds', round_doc_id, 'participants').stream())
-    for participant_doc in participants:
-        p_data = participant_doc.to_dict()
-        participant_map[p_data.get('playerId')] = participant_doc.id
+    # Wins are tallied locally so each winner gets one write, not one per game
+    wins_by_player = Counter()
+    last_win_by_player = {}
     
     for table_doc in tables:
         table_data = table_doc.to_dict()
@@ -96,15 +97,24 @@ def simulate_round_games(tournament_id, min_games_per_table=4, max_games_per_tab
             # Advance time by 3-8 minutes per game
             current_time += timedelta(minutes=random.randint(3, 8))
             
-            # Update player only (participants are immutable snapshots)
-            player_ref = db.collection('tournaments', tournament_id, 'players').document(winner_id)
-            player_ref.update({
-                'wins': firestore.Increment(1),
-                'lastWinAt': current_time
-            })
+            wins_by_player[winner_id] += 1
+            last_win_by_player[winner_id] = current_time
             
             total_games += 1
     
+    # Update players only (participants are immutable snapshots). Each player
+    # is written once, so the BulkWriter can pipeline them in any order.
+    writer = db.bulk_writer()
+    players_ref = db.collection('tournaments', tournament_id, 'players')
+    for winner_id, wins in wins_by_player.items():
+        writer.update(players_ref.document(winner_id), {
+            'wins': firestore.Increment(wins),
+            'lastWinAt': last_win_by_player[winner_id]
+        })
+    
+    # Wait for every queued update to be written
+    writer.close()
+    
     print(f"\n{'='*50}")
     print(f"✅ Simulated {total_games} game(s) across {len(tables)} table(s)")
     print(f"   Time span: {base_time.strftime('%H:%M')} - {current_time.strftime('%H:%M')}")
@@ -7,10 +7,26 @@ so you can watch the leaderboard update in real-time
 
 from setup_firebase import init_firebase
 from firebase_admin import firestore
+from google.rpc import code_pb2
 import sys
 import random
 import time
-from datetime import datetime, timedelta
+import heapq
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+# How often the background writer flushes queued wins to Firestore
+DRAIN_INTERVAL = 0.05
+
+# A failed win is retried only when its status means it wasn't applied, up
+# to this many attempts; a timed-out Increment may already have landed
+WRITE_MAX_ATTEMPTS = 10
+RETRYABLE_CODES = {
+    code_pb2.ABORTED,
+    code_pb2.UNAVAILABLE,
+    code_pb2.RESOURCE_EXHAUSTED,
+}
 
 def simulate_round_realtime(tournament_id, duration_seconds=15, simulated_minutes=30):
     """
@@ -55,9 +71,18 @@ def simulate_round_realtime(tournament_id, duration_seconds=15, simulated_minute
     
     print(f"   Tables: {len(tables)}")
     
+    # Player names for display, read once up front and folded into the
+    # schedule so dispatch does no lookups
+    players_query = db.collection('tournaments', tournament_id, 'players').select(['name'])
+    player_names = {p.id: p.to_dict().get('name', 'Unknown') for p in players_query.stream()}
+    
     # Generate game schedule for each table
     game_schedule = []  # List of (timestamp, table_id, player_id)
     
+    # Deadlines are on the monotonic clock, which wall-clock adjustments
+    # can't shift mid-simulation
+    schedule_start = time.monotonic()
+    
     for table_doc in tables:
         table_data = table_doc.to_dict()
         table_number = table_data.get('tableNumber', '?')
@@ -73,7 +98,7 @@ def simulate_round_realtime(tournament_id, duration_seconds=15, simulated_minute
         for game_idx in range(num_games):
             # Real-time: when during the simulation this game happens
             progress = (game_idx + 1) / (num_games + 1)  # Spread evenly, not at endpoints
-            real_timestamp = time.time() + (progress * duration_seconds)
+            real_timestamp = schedule_start + (progress * duration_seconds)
             
             # Pick random winner
             winner_id = random.choice(player_ids)
@@ -82,59 +107,130 @@ def simulate_round_realtime(tournament_id, duration_seconds=15, simulated_minute
                 'real_time': real_timestamp,
                 'table_id': table_doc.id,
                 'table_number': table_number,
-                'player_id': winner_id
+                'player_id': winner_id,
+                'player_name': player_names.get(winner_id, 'Unknown')
             })
     
-    # Bucket games into 0.1 second intervals
+    # Bucket games into 0.1 second intervals, queued on a heap keyed by
+    # bucket deadline (the index breaks ties so games are never compared)
     bucket_size = 0.1
-    buckets = {}
-    
-    for game in game_schedule:
-        bucket_time = round(game['real_time'] / bucket_size) * bucket_size
-        if bucket_time not in buckets:
-            buckets[bucket_time] = []
-        buckets[bucket_time].append(game)
-    
-    # Sort buckets by time
-    sorted_buckets = sorted(buckets.items())
+    schedule = [
+        (round(game['real_time'] / bucket_size) * bucket_size, i, game)
+        for i, game in enumerate(game_schedule)
+    ]
+    heapq.heapify(schedule)
+    num_buckets = len({bucket_time for bucket_time, _, _ in schedule})
     
     total_games = len(game_schedule)
-    print(f"\n🎮 Scheduled {total_games} games in {len(sorted_buckets)} buckets over {duration_seconds} seconds")
+    print(f"\n🎮 Scheduled {total_games} games in {num_buckets} buckets over {duration_seconds} seconds")
     print(f"   Simulated time span: {simulated_minutes} minutes")
     print(f"   Bucket size: {bucket_size}s")
     print(f"\n⏳ Starting simulation...\n")
     
-    start_time = time.time()
+    players_ref = db.collection('tournaments', tournament_id, 'players')
+    
+    start_time = time.monotonic()
     games_played = 0
     
-    for bucket_time, games in sorted_buckets:
-        # Wait until it's time for this bucket
-        now = time.time()
-        wait_time = bucket_time - now
-        
-        if wait_time > 0:
-            time.sleep(wait_time)
+    # The scheduler only queues wins; a single background writer drains the
+    # queue every DRAIN_INTERVAL into one BulkWriter flush. The scheduler
+    # never waits on Firestore, and each flush carries every win that
+    # arrived in the window. None marks the end of the simulation.
+    win_queue = queue.SimpleQueue()
+    
+    def drain_wins():
+        failures = []
         
-        # Process all games in this bucket
-        elapsed = time.time() - start_time
+        def on_write_error(error, bulk_writer):
+            if error.code in RETRYABLE_CODES and error.attempts < WRITE_MAX_ATTEMPTS:
+                return True
+            failures.append(error)
+            return False
         
-        for game in games:
-            # Record the win (use server timestamp for accurate current time)
-            player_ref = db.collection('tournaments', tournament_id, 'players').document(game['player_id'])
-            player_ref.update({
-                'wins': firestore.Increment(1),
-                'lastWinAt': firestore.SERVER_TIMESTAMP
-            })
+        writer = db.bulk_writer()
+        writer.on_write_error(on_write_error)
+        done = False
+        while not done:
+            deadline = time.monotonic() + DRAIN_INTERVAL
+            queued = 0
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = win_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    done = True
+                    break
+                player_id, win_time = item
+                writer.update(players_ref.document(player_id), {
+                    'wins': firestore.Increment(1),
+                    'lastWinAt': win_time
+                })
+                queued += 1
+            if queued:
+                writer.flush()
+                # Stop at the first lost win; the simulator checks for this
+                # before every bucket so it doesn't report wins never stored
+                if failures:
+                    raise RuntimeError(f"{len(failures)} win(s) failed to save, first: {failures[0].message}")
+        writer.close()
+    
+    # Run the writer on an executor so its errors surface from result()
+    executor = ThreadPoolExecutor(max_workers=1)
+    writer_future = executor.submit(drain_wins)
+    
+    try:
+        while schedule:
+            # Pop every game due in the next bucket
+            bucket_time = schedule[0][0]
+            games = []
+            while schedule and schedule[0][0] == bucket_time:
+                games.append(heapq.heappop(schedule)[2])
+            
+            # Wait until it's time for this bucket
+            wait_time = bucket_time - time.monotonic()
             
-            games_played += 1
+            if wait_time > 0:
+                time.sleep(wait_time)
             
-            # Get player name for display
-            player_data = player_ref.get().to_dict()
-            player_name = player_data.get('name', 'Unknown')
+            # The writer only exits early if it failed
+            if writer_future.done():
+                break
             
-            print(f"   [{elapsed:5.1f}s] Table {game['table_number']}: {player_name} wins! ({games_played}/{total_games})")
+            # Process all games in this bucket
+            elapsed = time.monotonic() - start_time
+            
+            # Every win in a bucket happens "now"; the simulator's clock stands
+            # in for the server timestamp
+            win_time = datetime.now(timezone.utc)
+            
+            for game in games:
+                # Record the win; it lands within DRAIN_INTERVAL
+                win_queue.put((game['player_id'], win_time))
+            
+            # One write to stdout per bucket rather than one per game
+            lines = []
+            for game in games:
+                games_played += 1
+                
+                lines.append(f"   [{elapsed:5.1f}s] Table {game['table_number']}: {game['player_name']} wins! ({games_played}/{total_games})")
+            print("\n".join(lines))
+    finally:
+        # Let the writer land the last wins (and stop) even if interrupted
+        win_queue.put(None)
     
-    elapsed_total = time.time() - start_time
+    try:
+        writer_future.result()
+    except Exception as e:
+        print(f"\n❌ Stopped: couldn't save wins to Firestore: {e}")
+        print(f"   {games_played} game(s) were simulated before stopping")
+        return
+    finally:
+        executor.shutdown()
+    elapsed_total = time.monotonic() - start_time
     
     print(f"\n{'='*60}")
     print(f"✅ Simulation complete!")
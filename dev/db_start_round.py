@@ -4,12 +4,43 @@ Start a tournament round
 Creates round record and snapshots all active players as participants
 """
 
-from setup_firebase import init_firebase
+from setup_firebase import init_firebase, WRITE_RETRY
 from firebase_admin import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
 import sys
+from multiprocessing.pool import ThreadPool
 
-def start_round(tournament_id):
+# Default writes per batched commit. Firestore allows 500, but smaller
+# batches committed in parallel finish sooner than a few large ones in a row.
+BATCH_SIZE = 50
+MAX_BATCH_SIZE = 500
+
+# Batched commits in flight at once
+COMMIT_WORKERS = 20
+
+# The player fields a participant snapshot copies
+SNAPSHOT_FIELDS = ['name', 'wins', 'points', 'tableId', 'position', 'lastWinAt']
+
+def _participant_snapshot(player_doc):
+    """Participant snapshot payload for a player document"""
+    p_data = player_doc.to_dict()
+    return {
+        'playerId': player_doc.id,
+        'name': p_data['name'],
+        'wins': p_data.get('wins', 0),
+        'points': p_data.get('points', 0),
+        'tableId': p_data.get('tableId'),
+        'position': p_data.get('position'),
+        'lastWinAt': p_data.get('lastWinAt'),
+        'snapshotAt': firestore.SERVER_TIMESTAMP
+    }
+
+def start_round(tournament_id, batch_size=BATCH_SIZE, skip_confirm=False):
     """Start the next round for a tournament"""
+    if not 1 <= batch_size <= MAX_BATCH_SIZE:
+        print(f"❌ Batch size must be between 1 and {MAX_BATCH_SIZE}")
+        return
+    
     db = init_firebase()
     
     # Get tournament
@@ -35,90 +66,152 @@ def start_round(tournament_id):
     print(f"   Current Round: {current_round}")
     print(f"   Next Round: {next_round}")
     
-    # Get active players
-    players_ref = db.collection('tournaments', tournament_id, 'players')
-    all_players = list(players_ref.stream())
+    # Get active players, filtered server-side so eliminated players are
+    # never downloaded (every player is created with eliminated: false)
+    players_query = (db.collection('tournaments', tournament_id, 'players')
+                     .where(filter=FieldFilter('eliminated', '==', False))
+                     .select(SNAPSHOT_FIELDS))
+    # Each player's participant snapshot is built as the stream arrives, with
+    # no intermediate player dicts
+    participants = [_participant_snapshot(p) for p in players_query.stream()]
     
-    active_players = []
-    for p in all_players:
-        p_data = p.to_dict()
-        if not p_data.get('eliminated', False):
-            active_players.append({'id': p.id, **p_data})
-    
-    if len(active_players) == 0:
+    if len(participants) == 0:
         print("❌ No active players found")
         return
     
-    if len(active_players) % 4 != 0:
-        remainder = len(active_players) % 4
+    if len(participants) % 4 != 0:
+        remainder = len(participants) % 4
         print(f"\n❌ Cannot start round!")
-        print(f"   Active players: {len(active_players)}")
+        print(f"   Active players: {len(participants)}")
         print(f"   Remainder: {remainder}")
         print(f"   Number of players must be divisible by 4")
         return
     
-    num_tables = len(active_players) // 4
+    num_tables = len(participants) // 4
     
-    confirm = input(f"\nStart Round {next_round} with {len(active_players)} active players ({num_tables} tables)? (y/N): ")
-    if confirm.lower() != 'y':
-        print("Cancelled.")
-        return
+    # Every write is prepared before asking for confirmation: document IDs
+    # are allocated client-side, so once confirmed there's nothing left to
+    # do but commit. The round record and every participant snapshot go out
+    # in batched commits, sent in parallel, instead of one round-trip per
+    # document.
+    round_ref = db.collection('tournaments', tournament_id, 'rounds').document()
+    participants_ref = round_ref.collection('participants')
+    
+    writes = [(round_ref, {
+        'roundNumber': next_round,
+        'startedAt': firestore.SERVER_TIMESTAMP,
+        'endedAt': None,
+        'status': 'in_progress'
+    })]
+    
+    # Snapshot all active players as participants
+    writes.extend((participants_ref.document(), snapshot) for snapshot in participants)
+    
+    if not skip_confirm:
+        confirm = input(f"\nStart Round {next_round} with {len(participants)} active players ({num_tables} tables)? (y/N): ")
+        if confirm.lower() != 'y':
+            print("Cancelled.")
+            return
     
     print(f"\n⏳ Starting Round {next_round}...")
     
+    chunks = [writes[i:i + batch_size] for i in range(0, len(writes), batch_size)]
+    
+    def commit_chunk(chunk):
+        batch = db.batch()
+        for ref, data in chunk:
+            batch.set(ref, data)
+        # Every write is a set of a fresh document ID, so retrying is safe
+        batch.commit(retry=WRITE_RETRY)
+    
+    def delete_chunk(chunk):
+        batch = db.batch()
+        for ref, _ in chunk:
+            batch.delete(ref)
+        batch.commit(retry=WRITE_RETRY)
+    
     try:
-        # Create round record
-        round_ref = db.collection('tournaments', tournament_id, 'rounds').document()
-        round_id = round_ref.id
+        print(f"   ⏳ Snapshotting {len(participants)} participants...")
         
-        round_ref.set({
-            'roundNumber': next_round,
-            'startedAt': firestore.SERVER_TIMESTAMP,
-            'endedAt': None,
-            'status': 'in_progress'
-        })
+        with ThreadPool(processes=min(COMMIT_WORKERS, len(chunks))) as pool:
+            pool.map(commit_chunk, chunks)
         
         print(f"   ✅ Round {next_round} record created")
+        print(f"   ✅ {len(participants)} participants snapshotted")
         
-        # Snapshot all active players as participants
-        print(f"   ⏳ Snapshotting {len(active_players)} participants...")
-        
-        for player in active_players:
-            participant_ref = db.collection('tournaments', tournament_id, 'rounds', round_id, 'participants').document()
-            participant_ref.set({
-                'playerId': player['id'],
-                'name': player['name'],
-                'wins': player.get('wins', 0),
-                'points': player.get('points', 0),
-                'tableId': player.get('tableId'),
-                'position': player.get('position'),
-                'lastWinAt': player.get('lastWinAt'),
-                'snapshotAt': firestore.SERVER_TIMESTAMP
+        # Update tournament last so it only flips to in-progress once the
+        # round and its snapshots exist. The check from the start is
+        # repeated in a transaction, so if another start got in while this
+        # one was confirming or writing, only one of them wins. The claim
+        # records this round's ID: if a commit lands but its response is
+        # lost, the retry finds its own write and succeeds instead of
+        # mistaking it for a competing start.
+        @firestore.transactional
+        def claim_round(transaction):
+            snapshot = tournament_ref.get(transaction=transaction)
+            t_now = snapshot.to_dict()
+            if t_now.get('startedRoundId') == round_ref.id:
+                return
+            if t_now.get('roundInProgress', False) or t_now.get('currentRound', 0) != current_round:
+                raise RuntimeError(f"Round {t_now.get('currentRound', 0)} was started in the meantime")
+            transaction.update(tournament_ref, {
+                'currentRound': next_round,
+                'roundInProgress': True,
+                'startedRoundId': round_ref.id
             })
         
-        print(f"   ✅ {len(active_players)} participants snapshotted")
-        
-        # Update tournament
-        tournament_ref.update({
-            'currentRound': next_round,
-            'roundInProgress': True
-        })
-        
-        print(f"\n{'='*50}")
-        print(f"✅ Round {next_round} started!")
-        print(f"   Participants: {len(active_players)}")
-        print(f"   Tables: {num_tables}")
-        print(f"{'='*50}\n")
+        claim_round(db.transaction())
         
     except Exception as e:
         print(f"\n❌ Error starting round: {e}")
+        
+        # A failed write doesn't prove the claim didn't land: a retried or
+        # transactional commit can be applied even though the client saw an
+        # error. Only roll back once a fresh read shows the tournament isn't
+        # on this round; deleting a claimed round would wipe a live one.
+        try:
+            claimed = tournament_ref.get(retry=WRITE_RETRY).get('startedRoundId') == round_ref.id
+        except Exception as read_error:
+            print(f"   ❌ Couldn't check the tournament: {read_error}")
+            print(f"   If it isn't on Round {next_round}, delete {round_ref.path} and its participants before retrying")
+            return
+        
+        if claimed:
+            print(f"\n✅ Round {next_round} started despite the error")
+            return
+        
+        # Delete whatever part of the new round landed so starting again
+        # begins clean
+        print(f"   ⏳ Rolling back Round {next_round}...")
+        try:
+            with ThreadPool(processes=min(COMMIT_WORKERS, len(chunks))) as pool:
+                pool.map(delete_chunk, chunks)
+            print(f"   ✅ Rolled back")
+        except Exception as rollback_error:
+            print(f"   ❌ Rollback failed: {rollback_error}")
+            print(f"   Delete {round_ref.path} and its participants before retrying")
+        return
+    
+    print(f"\n{'='*50}")
+    print(f"✅ Round {next_round} started!")
+    print(f"   Participants: {len(participants)}")
+    print(f"   Tables: {num_tables}")
+    print(f"{'='*50}\n")
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
+    args = [arg for arg in sys.argv[1:] if arg not in ('--yes', '-y')]
+    skip_confirm = len(args) < len(sys.argv) - 1
+    
+    if len(args) < 1:
         print("\n🎬 Start Tournament Round")
         print("="*50)
         print("Usage:")
-        print("  python db_start_round.py <tournament-id>")
+        print("  python db_start_round.py <tournament-id> [batch-size] [--yes]")
+        print("")
+        print("Arguments:")
+        print("  tournament-id  Tournament ID")
+        print(f"  batch-size     Writes per batched commit (default: {BATCH_SIZE}, max: {MAX_BATCH_SIZE})")
+        print("  --yes, -y      Skip the confirmation prompt")
         print("")
         print("This will:")
         print("  • Create a new round record")
@@ -130,7 +223,8 @@ if __name__ == "__main__":
         print("  • Active players divisible by 4")
         print("="*50 + "\n")
     else:
-        start_round(sys.argv[1])
+        batch_size = int(args[1]) if len(args) > 1 else BATCH_SIZE
+        start_round(args[0], batch_size, skip_confirm)
 
 
 
@@ -4,17 +4,68 @@ Database Statistics
 View statistics about your Firebase database
 """
 
-from setup_firebase import init_firebase
+from setup_firebase import init_firebase_async
+import asyncio
+import json
+import os
+import sys
+import time
 
-def get_stats():
-    """Get database statistics"""
-    db = init_firebase()
+# Counts from earlier runs, reused while a tournament's document hasn't
+# changed. Writes to a tournament's subcollections (players joining,
+# snapshots being taken) don't touch the tournament document, so entries
+# also expire CACHE_TTL seconds after they were counted; pass --no-cache to
+# always re-count.
+CACHE_FILE = os.path.expanduser('~/.speed_jong_stats_cache.json')
+CACHE_TTL = 300
+
+# The tournament fields the report prints
+TOURNAMENT_FIELDS = ['name', 'tournamentCode', 'status', 'type', 'currentRound']
+
+def _load_cache():
+    try:
+        with open(CACHE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(cache):
+    try:
+        with open(CACHE_FILE, 'w') as f:
+            json.dump(cache, f)
+    except OSError:
+        pass
+
+async def _collect(query):
+    return [doc async for doc in query.stream()]
+
+async def _count(query):
+    """Number of documents matching query, from a server-side count"""
+    result = await query.count().get()
+    return result[0][0].value
+
+async def _load_counts(tournament_ref):
+    """
+    Count a tournament's players, tables and rounds together. Returns
+    (players, tables, rounds) counts.
+    
+    Counts are aggregation queries, so no documents are downloaded just to
+    be counted.
+    """
+    return await asyncio.gather(
+        _count(tournament_ref.collection('players')),
+        _count(tournament_ref.collection('tables')),
+        _count(tournament_ref.collection('rounds'))
+    )
+
+async def _get_stats(use_cache=True):
+    db = init_firebase_async()
     
     print("\n📊 DATABASE STATISTICS\n" + "="*50)
     
     # Get all tournaments
     tournaments_ref = db.collection('tournaments')
-    tournaments = list(tournaments_ref.stream())
+    tournaments = await _collect(tournaments_ref.select(TOURNAMENT_FIELDS))
     
     print(f"\n🏆 Tournaments: {len(tournaments)}")
     
@@ -22,49 +73,87 @@ def get_stats():
         print("   No tournaments found.")
         return
     
-    total_players = 0
-    total_tables = 0
-    total_rounds = 0
-    total_participants = 0
+    now = time.time()
+    cache = _load_cache() if use_cache else {}
+    
+    def cached_entry(tournament):
+        entry = cache.get('tournaments', {}).get(tournament.id)
+        if (entry and entry['update_time'] == tournament.update_time.isoformat()
+                and now - entry['counted_at'] < CACHE_TTL):
+            return entry
+        return None
     
-    for tournament in tournaments:
+    entries = {t.id: cached_entry(t) for t in tournaments}
+    stale = [t for t in tournaments if entries[t.id] is None]
+    
+    tournament_ids = sorted(t.id for t in tournaments)
+    
+    async def count_participants():
+        # Only the participant total is reported, so one collection-group
+        # count covers every round of every tournament. It's reused only
+        # when every tournament was served from the cache and no tournament
+        # has been added or deleted since it was counted.
+        entry = cache.get('participants')
+        if (not stale and entry and entry.get('tournament_ids') == tournament_ids
+                and now - entry['counted_at'] < CACHE_TTL):
+            return entry
+        return {
+            'tournament_ids': tournament_ids,
+            'counted_at': now,
+            'count': await _count(db.collection_group('participants'))
+        }
+    
+    # Every stale tournament's reads are in flight at once, so the report
+    # takes about as long as the slowest tournament rather than the sum of
+    # them all
+    fresh_counts, participants_entry = await asyncio.gather(
+        asyncio.gather(*(_load_counts(tournament.reference) for tournament in stale)),
+        count_participants()
+    )
+    total_participants = participants_entry['count']
+    
+    for tournament, counts in zip(stale, fresh_counts):
+        entries[tournament.id] = {
+            'update_time': tournament.update_time.isoformat(),
+            'counted_at': now,
+            'counts': list(counts)
+        }
+    
+    # Save whenever anything was recounted, including just the total
+    if stale or participants_entry is not cache.get('participants'):
+        _save_cache({'tournaments': entries, 'participants': participants_entry})
+    
+    counts = [entries[tournament.id]['counts'] for tournament in tournaments]
+    total_players, total_tables, total_rounds = (sum(column) for column in zip(*counts))
+    
+    # The report is assembled once every count is in and written in one go,
+    # rather than one print per line
+    lines = []
+    for tournament, (players, tables, rounds) in zip(tournaments, counts):
         t_data = tournament.to_dict()
-        print(f"\n   📋 {t_data.get('name', 'Unnamed')}")
-        print(f"      ID: {tournament.id}")
-        print(f"      Tournament Code: {t_data.get('tournamentCode', 'N/A')}")
-        print(f"      Status: {t_data.get('status', 'unknown')}")
-        print(f"      Type: {t_data.get('type', 'standard')}")
-        print(f"      Current Round: {t_data.get('currentRound', 0)}")
-        
-        # Count players
-        players = list(db.collection('tournaments', tournament.id, 'players').stream())
-        total_players += len(players)
-        print(f"      Players: {len(players)}")
-        
-        # Count tables
-        tables = list(db.collection('tournaments', tournament.id, 'tables').stream())
-        total_tables += len(tables)
-        print(f"      Tables: {len(tables)}")
-        
-        # Count rounds
-        rounds_ref = db.collection('tournaments', tournament.id, 'rounds')
-        rounds = list(rounds_ref.stream())
-        total_rounds += len(rounds)
-        print(f"      Rounds: {len(rounds)}")
-        
-        # Count participants across all rounds
-        for round_doc in rounds:
-            participants = list(db.collection('tournaments', tournament.id, 'rounds', round_doc.id, 'participants').stream())
-            total_participants += len(participants)
-    
-    print(f"\n" + "="*50)
-    print(f"TOTALS:")
-    print(f"  Total Players: {total_players}")
-    print(f"  Total Tables: {total_tables}")
-    print(f"  Total Rounds: {total_rounds}")
-    print(f"  Total Participants (all rounds): {total_participants}")
-    print("="*50 + "\n")
+        lines.append(f"\n   📋 {t_data.get('name', 'Unnamed')}")
+        lines.append(f"      ID: {tournament.id}")
+        lines.append(f"      Tournament Code: {t_data.get('tournamentCode', 'N/A')}")
+        lines.append(f"      Status: {t_data.get('status', 'unknown')}")
+        lines.append(f"      Type: {t_data.get('type', 'standard')}")
+        lines.append(f"      Current Round: {t_data.get('currentRound', 0)}")
+        lines.append(f"      Players: {players}")
+        lines.append(f"      Tables: {tables}")
+        lines.append(f"      Rounds: {rounds}")
+    
+    lines.append("\n" + "="*50)
+    lines.append("TOTALS:")
+    lines.append(f"  Total Players: {total_players}")
+    lines.append(f"  Total Tables: {total_tables}")
+    lines.append(f"  Total Rounds: {total_rounds}")
+    lines.append(f"  Total Participants (all rounds): {total_participants}")
+    lines.append("="*50 + "\n")
+    print("\n".join(lines))
+
+def get_stats(use_cache=True):
+    """Get database statistics"""
+    asyncio.run(_get_stats(use_cache))
 
 if __name__ == "__main__":
-    get_stats()
+    get_stats(use_cache='--no-cache' not in sys.argv)
 
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Export Helpers
+JSON writing shared by db_export.py and db_export_state.py
+"""
+
+import json
+import os
+from contextlib import contextmanager
+
+def iso_default(obj):
+    """json default hook: Firestore timestamps serialize as ISO strings"""
+    if hasattr(obj, 'isoformat'):  # datetime/timestamp
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def write_json_value(f, value, depth):
+    """
+    Write value as JSON nested depth levels into the export
+    
+    Pieces written this way lay out exactly as json.dump(..., indent=2) of
+    the whole export would (JSON strings never contain raw newlines, so
+    re-indenting every line is safe).
+    """
+    f.write(json.dumps(value, indent=2, default=iso_default).replace('\n', '\n' + '  ' * depth))
+
+def write_json_array(f, items):
+    """Write items to f as a top-level field's JSON array as they arrive, returning the count"""
+    f.write('[')
+    count = 0
+    for item in items:
+        f.write(',\n    ' if count else '\n    ')
+        write_json_value(f, item, 2)
+        count += 1
+    f.write('\n  ]' if count else ']')
+    return count
+
+def export_docs(docs):
+    for doc in docs:
+        yield {'id': doc.id, **doc.to_dict()}
+
+@contextmanager
+def open_export(output_file):
+    """
+    Open output_file for writing an export
+    
+    The export is written to a temp file and only moved to the real name
+    once complete, so a failed export never leaves a truncated file behind.
+    """
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    temp_file = output_file + '.tmp'
+    with open(temp_file, 'w') as f:
+        yield f
+    os.replace(temp_file, output_file)
@@ -4,26 +4,88 @@ Firebase Admin SDK Setup
 Initialize the Firebase Admin SDK for server-side operations
 """
 
+import json
+import os
 import firebase_admin
 from firebase_admin import credentials, firestore
+from google.cloud import firestore as gcloud_firestore
+from google.api_core import exceptions, retry
 
 # Initialize Firebase Admin SDK
 # You'll need to download a service account key from Firebase Console:
 # Project Settings > Service Accounts > Generate New Private Key
-# Save it as 'serviceAccountKey.json' in this directory
+# Save it as 'serviceAccountKey.json' in this directory, or skip the file:
+# - FIREBASE_CREDENTIALS_JSON: the key's JSON contents, parsed in memory
+# - GOOGLE_APPLICATION_CREDENTIALS: Application Default Credentials
 
-def init_firebase():
-    """Initialize Firebase Admin SDK"""
+# Retry policy for writes that are safe to repeat (set/update with plain
+# values, batch commits of those). Transient contention, throttling and
+# timeouts back off exponentially with jitter instead of failing the script.
+# Don't use it for writes containing firestore.Increment: a retry after a
+# deadline could apply the increment twice.
+WRITE_RETRY = retry.Retry(
+    predicate=retry.if_exception_type(
+        exceptions.Aborted,
+        exceptions.DeadlineExceeded,
+        exceptions.ServiceUnavailable,
+        exceptions.ResourceExhausted,
+    ),
+    initial=0.1,
+    maximum=5.0,
+    multiplier=2.0,
+    deadline=60.0,
+)
+
+# Shared Firebase app and Firestore client, reused so the key file is
+# parsed once and every call in a process shares one set of gRPC channels
+# instead of paying connection setup again
+_app = None
+_db = None
+
+def _init_app():
+    """Return the default Firebase app, initializing it on first use"""
+    global _app
+    if _app is not None:
+        return _app
+    
     try:
-        # Try to initialize (will fail if already initialized)
-        cred = credentials.Certificate('serviceAccountKey.json')
-        firebase_admin.initialize_app(cred)
-        print("✅ Firebase Admin SDK initialized")
+        # Reuse an app something else in the process already initialized
+        _app = firebase_admin.get_app()
     except ValueError:
-        # Already initialized
-        print("ℹ️  Firebase Admin SDK already initialized")
+        if os.getenv('FIREBASE_CREDENTIALS_JSON'):
+            cred = credentials.Certificate(json.loads(os.environ['FIREBASE_CREDENTIALS_JSON']))
+        elif os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
+            cred = None  # the SDK picks up Application Default Credentials
+        else:
+            cred = credentials.Certificate('serviceAccountKey.json')
+        _app = firebase_admin.initialize_app(cred)
+        print("✅ Firebase Admin SDK initialized")
+    return _app
+
+def init_firebase():
+    """Initialize Firebase Admin SDK and return the shared Firestore client"""
+    global _db
+    if _db is not None:
+        return _db
+    
+    _db = firestore.client(_init_app())
+    return _db
+
+def init_firebase_async():
+    """
+    Initialize Firebase Admin SDK and return a new async Firestore client
     
-    return firestore.client()
+    Async clients bind to the event loop they're first used on, and
+    firebase_admin.firestore_async.client() returns one cached client per
+    app, which a second asyncio.run() would find tied to a closed loop. So
+    each call builds a fresh client from the app's credentials; call it
+    once per event loop, from inside that loop.
+    """
+    app = _init_app()
+    return gcloud_firestore.AsyncClient(
+        project=app.project_id,
+        credentials=app.credential.get_credential()
+    )
 
 if __name__ == "__main__":
     db = init_firebase()
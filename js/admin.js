@@ -1603,6 +1603,7 @@ document.getElementById('importBulkPlayerBtn').addEventListener('click', async (
             const playerRef = doc(collection(db, 'tournaments', currentTournamentId, 'players'));
             batch.set(playerRef, {
                 name,
+                nameLower: name.toLowerCase(),
                 registeredAt: serverTimestamp(),
                 tableId: null,
                 position: null,
@@ -1651,7 +1652,8 @@ document.getElementById('playerForm').addEventListener('submit', async (e) => {
         if (currentEditingPlayerId) {
             // Update existing player
             await updateDoc(doc(db, 'tournaments', currentTournamentId, 'players', currentEditingPlayerId), {
-                name
+                name,
+                nameLower: name.toLowerCase()
             });
         } else {
             // Create new player - double check limit (in case it changed)
@@ -1668,6 +1670,7 @@ document.getElementById('playerForm').addEventListener('submit', async (e) => {
             const playerRef = doc(collection(db, 'tournaments', currentTournamentId, 'players'));
             await setDoc(playerRef, {
                 name,
+                nameLower: name.toLowerCase(),
                 registeredAt: serverTimestamp(),
                 tableId: null,
                 position: null,